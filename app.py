@@ -3,15 +3,38 @@ import hashlib
 import json
 import os
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime
 from cryptography.fernet import Fernet
 from chatbot.conversation import call_llm
-from chatbot.memory import init_context, get_conversation_summary, clear_context, save_context_to_file
+from chatbot.memory import (
+    SESSION_TIMEOUT, init_context, get_conversation_summary, clear_context,
+    save_context_to_file, get_session_store
+)
+from chatbot.calendar_utils import list_user_appointments
 from chatbot.orchestrator import orchestrated_llm_call
+from chatbot.encryption import get_record_cipher
+from chatbot.replay import start_recording
+from chatbot.retention import delete_user_data, start_retention_sweeper
 
 # Page configuration
 st.set_page_config(page_title="Medical Assistant", layout="centered", page_icon="🎺")
 
+# Messages rendered per history page; older ones load on demand
+HISTORY_PAGE_SIZE = 10
+
+# With ENCRYPTION_AT_REST=on, refuse to serve anything until secret.key exists
+try:
+    get_record_cipher()
+except ValueError as e:
+    st.error(str(e))
+    st.stop()
+
+# Background cleanup of expired session files and oversized logs (once per process)
+start_retention_sweeper()
+
+# Record Bedrock calls for offline replay when LLM_RECORDING=on
+start_recording()
+
 # Encryption utilities
 def load_key():
     return open("secret.key", "rb").read()
@@ -80,10 +103,10 @@ class SimpleAuth:
         self.save_users()
         return True, "User deleted successfully"
 
+@st.cache_resource
 def get_auth():
-    if 'auth_instance' not in st.session_state:
-        st.session_state.auth_instance = SimpleAuth()
-    return st.session_state.auth_instance
+    """Shared across sessions so users.json is decrypted once per process, not per browser tab"""
+    return SimpleAuth()
 
 def login_form():
     st.markdown("## 🔐 Medical Assistant - Login")
@@ -110,20 +133,20 @@ def login_form():
                 st.error("Please enter both username and password")
     st.info("**Default Login:** Username: `admin`, Password: `admin123`")
 
+def give_consent():
+    st.session_state.consent_given = True
+
 def check_consent():
     if "consent_given" not in st.session_state:
         st.markdown("### 📜 Consent to Proceed")
-        if st.button("I consent to use this chatbot for scheduling purposes only"):
-            st.session_state.consent_given = True
-            st.rerun()
-        else:
-            st.stop()
+        st.button("I consent to use this chatbot for scheduling purposes only", on_click=give_consent)
+        st.stop()
 
 def check_session():
     if not st.session_state.get("authenticated"):
         return False
     if st.session_state.get("login_time"):
-        if datetime.now() - st.session_state.login_time > timedelta(minutes=30):
+        if datetime.now() - st.session_state.login_time > SESSION_TIMEOUT:
             st.error("Session expired. Please log in again.")
             for key in ["authenticated", "username", "user_name", "login_time"]:
                 if key in st.session_state:
@@ -131,6 +154,55 @@ def check_session():
             return False
     return True
 
+# Button callbacks run before the next script run, so none of them needs st.rerun()
+def logout():
+    for key in ["authenticated", "username", "user_name", "login_time"]:
+        if key in st.session_state:
+            del st.session_state[key]
+
+def queue_prompt(prompt, action):
+    with open("logs/audit.log", "a") as log:
+        log.write(f"{datetime.now()} - ACTION - {st.session_state.username} requested {action}\n")
+    st.session_state.pending_prompt = prompt
+
+def clear_conversation():
+    st.session_state.context = clear_context(st.session_state.context)
+    st.session_state.context["username"] = st.session_state.username
+    st.session_state.history_pages = 1
+    st.toast("Conversation cleared!")
+
+def load_older_messages():
+    st.session_state.history_pages = st.session_state.get("history_pages", 1) + 1
+
+def render_history(history):
+    visible = st.session_state.get("history_pages", 1) * HISTORY_PAGE_SIZE
+    if len(history) > visible:
+        st.button(f"⬆️ Load older messages ({len(history) - visible} hidden)", on_click=load_older_messages)
+    for message in history[-visible:]:
+        with st.chat_message(message['role'], avatar="👤" if message['role'] == 'user' else "🩺"):
+            st.markdown(message['content'])
+
+@st.fragment
+def chat_view():
+    """Chat history and input; sending a message reruns only this fragment"""
+    history_box = st.container()
+    prompt = st.chat_input("e.g., 'Schedule an appointment for June 25 at 2:00 PM'")
+    prompt = prompt or st.session_state.pop("pending_prompt", None)
+
+    with history_box:
+        render_history(st.session_state.context.get('conversation_history', []))
+        if prompt:
+            with st.chat_message("user", avatar="👤"):
+                st.markdown(prompt)
+            with st.chat_message("assistant", avatar="🩺"):
+                with st.spinner("Thinking..."):
+                    try:
+                        response, updated_context = orchestrated_llm_call(prompt, st.session_state.context)
+                        st.session_state.context = updated_context
+                        st.markdown(response)
+                    except Exception as e:
+                        st.error(f"Error processing your request: {e}")
+
 def main_app():
     if not check_session():
         login_form()
@@ -140,34 +212,24 @@ def main_app():
     st.title("🩺 Medical Appointment Assistant")
 
     if "context" not in st.session_state:
-        st.session_state.context = init_context()
-        st.session_state.context["username"] = st.session_state.username  # Inject username for booking
+        # Resume from the shared store when this request lands on another replica
+        context = init_context(session_id=st.query_params.get("sid"), store=get_session_store(),
+                               username=st.session_state.username)
+        context["username"] = st.session_state.username  # Inject username for booking
+        st.session_state.context = context
+    st.query_params["sid"] = st.session_state.context["session_id"]
 
     with st.sidebar:
         st.header(f"**Welcome, {st.session_state.user_name}!**")
-        if st.button("🚪 Logout"):
-            for key in list(st.session_state.keys()):
-                if key in ["authenticated", "username", "user_name", "login_time"]:
-                    del st.session_state[key]
-            st.rerun()
+        st.button("🚪 Logout", on_click=logout)
 
         st.header("Session Options")
-        if st.button("ℹ️ General Health Info"):
-            with open("logs/audit.log", "a") as log:
-                log.write(f"{datetime.now()} - ACTION - {st.session_state.username} requested health info\n")
-            response, updated_context = orchestrated_llm_call("Can you provide some general health information?", st.session_state.context)
-            st.session_state.context = updated_context
-            st.rerun()
-
-        if st.button("🗕️ Schedule Appointment"):
-            with open("logs/audit.log", "a") as log:
-                log.write(f"{datetime.now()} - ACTION - {st.session_state.username} requested appointment scheduling\n")
-            response, updated_context = orchestrated_llm_call("I'd like to schedule an appointment", st.session_state.context)
-            st.session_state.context = updated_context
-            st.rerun()
+        st.button("ℹ️ General Health Info", on_click=queue_prompt,
+                  args=("Can you provide some general health information?", "health info"))
+        st.button("🗕️ Schedule Appointment", on_click=queue_prompt,
+                  args=("I'd like to schedule an appointment", "appointment scheduling"))
 
         if st.button("📋 View My Appointments"):
-            from calendar_utils import list_user_appointments
             appointments = list_user_appointments(st.session_state.username)
             st.markdown("### 📖 Your Appointments")
             if appointments:
@@ -176,51 +238,18 @@ def main_app():
             else:
                 st.info("You don’t have any appointments yet.")
 
-        if st.button("🧹 Clear Conversation"):
-            st.session_state.context = clear_context(st.session_state.context)
-            st.success("Conversation cleared!")
-            st.rerun()
+        st.button("🧹 Clear Conversation", on_click=clear_conversation)
 
         if st.button("Delete My Data"):
+            result = delete_user_data(st.session_state.username, session_ids=[st.session_state.context["session_id"]])
             st.session_state.context = clear_context(st.session_state.context)
-            st.success("Your conversation data has been deleted.")
+            st.session_state.context["username"] = st.session_state.username
+            st.query_params["sid"] = st.session_state.context["session_id"]
+            st.success(f"Your data has been deleted ({len(result['session_files'])} saved sessions, "
+                       f"{len(result['appointments'])} appointments).")
 
     st.markdown("### Chat with your Medical Assistant")
-    if st.session_state.context.get('conversation_history'):
-        for message in st.session_state.context['conversation_history'][-6:]:
-            if message['role'] == 'user':
-                st.markdown(f"**👤 You:** {message['content']}")
-            else:
-                st.markdown(f"**🩺 Assistant:** {message['content']}")
-        st.markdown("---")
-
-    if "message_sent" not in st.session_state:
-        st.session_state.message_sent = False
-
-    col1, col2 = st.columns([4, 1])
-    with col1:
-        user_input = st.text_input(
-            "Ask me something:",
-            placeholder="e.g., 'Schedule an appointment for June 25 at 2:00 PM'",
-            key="user_input_field",
-            value="" if st.session_state.message_sent else st.session_state.get("user_input_field", "")
-        )
-    with col2:
-        st.markdown("<br>", unsafe_allow_html=True)
-        send_button = st.button("Send", type="primary")
-
-    if send_button and user_input:
-        with st.spinner("Thinking..."):
-            try:
-                response, updated_context = orchestrated_llm_call(user_input, st.session_state.context)
-                st.session_state.context = updated_context
-            except Exception as e:
-                st.error(f"Error processing your request: {e}")
-        st.session_state.message_sent = True
-        st.rerun()
-
-    if st.session_state.message_sent:
-        st.session_state.message_sent = False
+    chat_view()
 
     st.markdown("---")
     st.markdown("*💡 Tip: This assistant can help with appointment scheduling and general health information. For medical emergencies, please contact your healthcare provider or emergency services.*")
@@ -0,0 +1,93 @@
+"""Script runs and server CPU per chat message, measured with Streamlit's AppTest.
+
+The LLM is stubbed out, so the numbers cover only the app's own render path.
+Run from the project root:
+
+    python benchmarks/bench_app.py [--messages 30] [--app app.py]
+
+Pass an older copy of app.py with --app to compare before and after.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from unittest.mock import patch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ.setdefault("BEDROCK_MODEL_ID", "benchmark-stub")
+
+import streamlit
+from streamlit.testing.v1 import AppTest
+
+
+def stub_response(messages, system_prompt=None):
+    return f"Stub reply #{len(messages)}: your appointment is confirmed for 2025-08-23 at 10:00."
+
+
+def send(at, text):
+    """Send one chat message through whichever input the app renders"""
+    if len(at.chat_input):
+        at.chat_input[0].set_value(text).run()
+    else:
+        at.text_input(key="user_input_field").set_value(text)
+        next(button for button in at.button if button.label == "Send").click().run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=30)
+    parser.add_argument("--app", default=os.path.join(ROOT, "app.py"))
+    args = parser.parse_args()
+    app_path = os.path.abspath(args.app)
+
+    runs = 0
+    original_set_page_config = streamlit.set_page_config
+
+    def counting_set_page_config(*a, **kw):
+        nonlocal runs
+        runs += 1
+        return original_set_page_config(*a, **kw)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # The app writes logs, sessions and the calendar relative to the working directory
+        os.chdir(tmp)
+        os.makedirs("logs")
+        os.makedirs("data")
+
+        with patch("chatbot.conversation.llm.generate_response", side_effect=stub_response), \
+                patch.object(streamlit, "set_page_config", counting_set_page_config):
+            at = AppTest.from_file(app_path, default_timeout=30)
+            at.session_state["authenticated"] = True
+            at.session_state["username"] = "benchmark"
+            at.session_state["user_name"] = "Benchmark"
+            at.session_state["login_time"] = datetime.now()
+            at.session_state["consent_given"] = True
+            at.run()
+
+            cpu, wall, per_message_runs = [], [], []
+            for i in range(args.messages):
+                runs_before = runs
+                cpu_start, wall_start = time.process_time(), time.perf_counter()
+                send(at, f"Please book an appointment, message {i}")
+                cpu.append(time.process_time() - cpu_start)
+                wall.append(time.perf_counter() - wall_start)
+                per_message_runs.append(runs - runs_before)
+                if at.exception:
+                    raise RuntimeError(at.exception[0].message)
+
+        history = at.session_state["context"]["conversation_history"]
+
+    print(f"app: {app_path}")
+    print(f"messages sent: {args.messages}, history length: {len(history)}")
+    print(f"script runs per message: {statistics.mean(per_message_runs):.2f}")
+    print(f"server CPU per message:  p50 {statistics.median(cpu) * 1e3:.1f} ms   total {sum(cpu) * 1e3:.0f} ms")
+    print(f"wall time per message:   p50 {statistics.median(wall) * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Batch throughput against worker count, with a simulated model latency.
+
+Run from the project root:
+
+    python benchmarks/bench_batch.py [--requests 48] [--latency-ms 200] [--workers 1 2 4 8]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot import calendar_utils
+from chatbot.batch import run_batch
+
+
+def fake_generate(latency):
+    """Stand-in for Bedrock: waits like a network call, then confirms the requested slot"""
+    def generate(messages, system_prompt=None):
+        time.sleep(latency)
+        return f"Your appointment is confirmed for {messages[-1]['content'].rsplit(' ', 1)[-1]}."
+    return generate
+
+
+def write_requests(path, count):
+    slots = list(calendar_utils.generate_daily_slots())
+    with open(path, 'w') as f:
+        for i in range(count):
+            day = f"2025-09-{1 + i // len(slots):02d}"
+            f.write(json.dumps({"message": f"book appointment {day} at {slots[i % len(slots)]}"}) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=48)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, "requests.jsonl")
+        write_requests(input_path, args.requests)
+        calendar_utils.CALENDAR_FILE = os.path.join(tmp, "calendar.json")
+
+        for workers in args.workers:
+            calendar_utils.save_calendar({})
+            start = time.perf_counter()
+            summary = run_batch(input_path, os.path.join(tmp, "results.jsonl"), workers=workers,
+                                generate=fake_generate(args.latency_ms / 1000))
+            elapsed = time.perf_counter() - start
+            print(f"{workers:>3} workers: {elapsed:6.2f} s, {args.requests / elapsed:6.1f} requests/s  {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Throughput of the local date/time resolver.
+
+Run from the project root:
+
+    python benchmarks/bench_datetime_parser.py [--parses 100000]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot.datetime_parser import extract_canonical_datetime, resolve_datetime
+
+SAMPLES = [
+    "Hi i need to schedule an appointment at 3pm next tuesday",
+    "Hi i need to schedule an appointment at 3pm august 23rd 2025",
+    "Can I come in tomorrow afternoon?",
+    "between 2 and 4pm on friday please",
+    "Book me for 7/4 at noon",
+    "in two weeks at 10:30 am",
+    "What are the symptoms of flu?",
+    "Great, I've scheduled your appointment for:\n\n2025-08-23 at 15:00",
+]
+
+
+def measure(fn, parses):
+    now = datetime(2025, 6, 23, 13, 53)
+    texts = [SAMPLES[i % len(SAMPLES)] for i in range(parses)]
+    start = time.perf_counter()
+    if fn is resolve_datetime:
+        for text in texts:
+            fn(text, now=now)
+    else:
+        for text in texts:
+            fn(text)
+    return parses / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--parses", type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"resolve_datetime:           {measure(resolve_datetime, args.parses):>10,.0f} parses/s")
+    print(f"extract_canonical_datetime: {measure(extract_canonical_datetime, args.parses):>10,.0f} parses/s")
+
+
+if __name__ == "__main__":
+    main()
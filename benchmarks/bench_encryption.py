@@ -0,0 +1,86 @@
+"""Booking latency with and without encryption at rest.
+
+Run from the project root:
+
+    python benchmarks/bench_encryption.py [--days 90] [--bookings 500]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cryptography.fernet import Fernet
+
+import chatbot.encryption
+from chatbot import calendar_utils
+from chatbot.encryption import RecordCipher, set_record_cipher
+
+
+def seed_calendar(days):
+    calendar = {}
+    for day in range(days):
+        date_str = f"2025-{1 + day // 28:02d}-{1 + day % 28:02d}"
+        calendar_utils.ensure_day_exists(calendar, date_str)
+    calendar_utils.save_calendar(calendar)
+    return list(calendar)
+
+
+class Setup:
+    """One calendar file plus the encryption settings it is booked with"""
+
+    def __init__(self, directory, name, cipher):
+        self.name = name
+        self.calendar_file = os.path.join(directory, f"{name}.json")
+        self.cipher = cipher
+        self.samples = []
+
+    def activate(self):
+        calendar_utils.CALENDAR_FILE = self.calendar_file
+        chatbot.encryption.ENCRYPTION_AT_REST = "on" if self.cipher else "off"
+        set_record_cipher(self.cipher)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--bookings", type=int, default=500)
+    args = parser.parse_args()
+
+    cipher = RecordCipher(Fernet.generate_key(), cache_size=args.days * 2)
+    slots = list(calendar_utils.generate_daily_slots())
+    rng = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setups = [Setup(tmp, "plaintext", None), Setup(tmp, "encrypted", cipher)]
+        for setup in setups:
+            setup.activate()
+            dates = seed_calendar(args.days)
+
+        # Interleave the two setups so machine noise affects both equally
+        for i in range(args.bookings + 20):
+            date_str, time_str = rng.choice(dates), rng.choice(slots)
+            for setup in setups:
+                setup.activate()
+                start = time.perf_counter()
+                calendar_utils.book_slot(f"user{i}", date_str, time_str)
+                if i >= 20:  # warm-up
+                    setup.samples.append(time.perf_counter() - start)
+        set_record_cipher(None)
+
+    print(f"calendar: {args.days} days, {args.bookings} bookings")
+    p50 = {}
+    for setup in setups:
+        p50[setup.name] = statistics.median(setup.samples)
+        p95 = statistics.quantiles(setup.samples, n=20)[-1]
+        print(f"{setup.name:<10} p50 {p50[setup.name] * 1e3:7.3f} ms   p95 {p95 * 1e3:7.3f} ms")
+    overhead = (p50["encrypted"] - p50["plaintext"]) / p50["plaintext"] * 100
+    print(f"overhead   {overhead:+.1f}% (p50)   decrypt cache hits {cipher.hits}, misses {cipher.misses}")
+
+
+if __name__ == "__main__":
+    main()
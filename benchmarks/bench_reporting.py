@@ -0,0 +1,62 @@
+"""Utilization report and export time over a year-long calendar.
+
+Run from the project root:
+
+    python benchmarks/bench_reporting.py [--days 365] [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot import calendar_utils
+from chatbot.calendar_utils import generate_daily_slots
+from chatbot.reporting import export_calendar, utilization_report
+
+
+def seed_calendar(days):
+    """Two thirds of the slots booked across 50 users"""
+    calendar = {}
+    start = date(2025, 1, 1)
+    for offset in range(days):
+        slots = generate_daily_slots()
+        for i, slot in enumerate(slots):
+            if (offset + i) % 3:
+                slots[slot] = f"user{(offset * 7 + i) % 50}"
+        calendar[(start + timedelta(days=offset)).isoformat()] = slots
+    return calendar
+
+
+def measure(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    calendar = seed_calendar(args.days)
+    with tempfile.TemporaryDirectory() as tmp:
+        calendar_utils.CALENDAR_FILE = os.path.join(tmp, "calendar.json")
+        calendar_utils.save_calendar(calendar)
+
+        print(f"utilization_report ({args.days} days): {measure(lambda: utilization_report(calendar), args.runs):8.1f} ms")
+        for extension in ("csv", "parquet"):
+            path = os.path.join(tmp, f"calendar.{extension}")
+            print(f"export_calendar {extension:<8}         {measure(lambda: export_calendar(path), args.runs):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# batch.py
+import argparse
+import json
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Iterator, List
+
+from chatbot.calendar_utils import book_slot, next_free_slot
+from chatbot.conversation import (
+    build_system_prompt, current_username, extract_datetime, is_scheduling_request, llm,
+)
+from chatbot.datetime_parser import clinic_now, resolve_datetime
+
+DEFAULT_WORKERS = 4
+
+logger = logging.getLogger(__name__)
+
+
+def read_requests(path: str) -> Iterator[Dict]:
+    """Yield requests from a JSONL file in arrival (line) order.
+
+    Each line needs a "message" and may carry "request_id" and "username".
+    A line that cannot be used is yielded with an 'error' so the batch
+    reports it and carries on.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                request = {'error': f"line {line_number} is not valid JSON: {e}"}
+            if not isinstance(request, dict):
+                request = {'error': f"line {line_number} is not a JSON object"}
+            elif 'error' not in request and not isinstance(request.get('message'), str):
+                request['error'] = f"line {line_number} has no 'message'"
+            elif 'error' not in request:
+                # A None username would be written as a free slot while the result says booked
+                username = request.setdefault('username', 'intake')
+                if not isinstance(username, str) or not username:
+                    request['error'] = f"line {line_number} has an invalid 'username'"
+            request.setdefault('request_id', f"line-{line_number}")
+            request.setdefault('username', 'intake')
+            yield request
+
+
+def draft_request(request: Dict, generate: Callable, now=None) -> Dict:
+    """Ask the LLM for a reply and work out the proposed slot; never touches the calendar"""
+    draft = {'request': request, 'response': None, 'proposed': (None, None), 'candidates': [],
+             'error': request.get('error')}
+    if draft['error']:
+        draft['latency_ms'] = 0.0
+        return draft
+    message = request['message']
+    start = time.perf_counter()
+    token = current_username.set(request['username'])
+    try:
+        draft['response'] = generate([{"role": "user", "content": message}], build_system_prompt(message, now))
+        if is_scheduling_request(message):
+            date, slot = extract_datetime(draft['response'])
+            if not date:
+                # No follow-up turn in batch mode, so only book what the request states exactly;
+                # anything a human would have to confirm is listed as candidates instead
+                resolution = resolve_datetime(message, now=now)
+                if resolution['date'] and resolution['time'] and resolution['in_clinic_hours']:
+                    if resolution['alternative_date'] is None and not resolution['snapped']:
+                        date, slot = resolution['date'], resolution['time']
+                    else:
+                        dates = [resolution['date'], resolution['alternative_date']]
+                        draft['candidates'] = [f"{d} {resolution['time']}" for d in dates if d]
+            draft['proposed'] = (date, slot)
+    except Exception as e:
+        draft['error'] = str(e)
+    finally:
+        current_username.reset(token)
+    draft['latency_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return draft
+
+
+def commit_draft(draft: Dict) -> Dict:
+    """Book a drafted request; called strictly in arrival order so conflicts resolve first come, first served"""
+    request = draft['request']
+    result = {
+        'request_id': request['request_id'],
+        'username': request['username'],
+        'status': 'answered',
+        'scheduled_for': None,
+        'suggested': None,
+        'candidates': draft['candidates'],
+        'response': draft['response'],
+        'latency_ms': draft['latency_ms'],
+    }
+    date, slot = draft['proposed']
+
+    if draft['error']:
+        result['status'] = 'error'
+        result['response'] = draft['error']
+    elif is_scheduling_request(request['message']):
+        if not date:
+            result['status'] = 'no_slot'
+        else:
+            success, booking_msg = book_slot(request['username'], date, slot)
+            result['status'] = 'booked' if success else 'conflict'
+            result['scheduled_for'] = f"{date} {slot}"
+            if not success:
+                suggestion = next_free_slot(date, after=slot)
+                result['suggested'] = f"{date} {suggestion}" if suggestion else None
+            result['booking'] = booking_msg
+    return result
+
+
+def run_batch(input_path: str, output_path: str, workers: int = DEFAULT_WORKERS,
+              generate: Callable = None) -> Dict:
+    """Process a JSONL file of scheduling requests with a bounded worker pool.
+
+    LLM calls run concurrently; bookings are committed one at a time in
+    input order and results are written to output_path as JSONL in the
+    same order. Returns a count of results per status. A custom
+    generate(messages, system_prompt) must raise when the model call fails.
+    """
+    # Failed calls must raise, or the apology text would be treated as a reply and the fallback would book
+    generate = generate or partial(llm.generate_response, raise_errors=True)
+    now = clinic_now()
+    summary = {}
+    start = time.perf_counter()
+
+    with open(output_path, 'w', encoding='utf-8') as out, ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+
+        def commit_oldest():
+            result = commit_draft(in_flight.popleft().result())
+            summary[result['status']] = summary.get(result['status'], 0) + 1
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+        for request in read_requests(input_path):
+            in_flight.append(pool.submit(draft_request, request, generate, now))
+            # Bound the queue so large files are streamed rather than loaded up front
+            if len(in_flight) >= workers * 2:
+                commit_oldest()
+        while in_flight:
+            commit_oldest()
+
+    logger.info("Batch %s finished in %.2f seconds with %d workers: %s",
+                input_path, time.perf_counter() - start, workers, summary)
+    return summary
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Process a JSONL file of scheduling requests")
+    parser.add_argument("input", help="JSONL with one {request_id, username, message} per line")
+    parser.add_argument("output", help="JSONL file to write results to")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args(argv)
+
+    summary = run_batch(args.input, args.output, workers=args.workers)
+    print(f"Wrote {sum(summary.values())} results to {args.output}: {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,22 @@
 # calendar_utils.py
-import json
 from datetime import datetime, timedelta
+from chatbot.encryption import load_json_records, save_json_records
 
 CALENDAR_FILE = "./data/calendar.json"
+CLINIC_OPEN = "10:00"
+CLINIC_CLOSE = "16:00"
+SLOT_MINUTES = 30
 
 def load_calendar():
     try:
-        with open(CALENDAR_FILE, "r") as f:
-            return json.load(f)
+        return load_json_records(CALENDAR_FILE)
     except FileNotFoundError:
         return {}
 
 def save_calendar(calendar):
-    with open(CALENDAR_FILE, "w") as f:
-        json.dump(calendar, f, indent=2)
+    save_json_records(CALENDAR_FILE, calendar)
 
-def generate_daily_slots(start="10:00", end="16:00", interval=30):
+def generate_daily_slots(start=CLINIC_OPEN, end=CLINIC_CLOSE, interval=SLOT_MINUTES):
     slots = {}
     current = datetime.strptime(start, "%H:%M")
     end_time = datetime.strptime(end, "%H:%M")
@@ -33,7 +34,9 @@ def book_slot(username, date_str, time_str):
     calendar = load_calendar()
     calendar = ensure_day_exists(calendar, date_str)
 
-    if calendar[date_str].get(time_str) is None:
+    if time_str not in calendar[date_str]:
+        return False, f"Sorry, {time_str} is not an appointment slot; slots run every {SLOT_MINUTES} minutes from {CLINIC_OPEN} to {CLINIC_CLOSE}."
+    if calendar[date_str][time_str] is None:
         calendar[date_str][time_str] = username
         save_calendar(calendar)
         return True, f"Appointment booked on {date_str} at {time_str}."
@@ -47,4 +50,23 @@ def list_user_appointments(username):
         for time, user in slots.items():
             if user == username:
                 appointments.append(f"{date} at {time}")
-    return appointments
\ No newline at end of file
+    return appointments
+
+def cancel_user_appointments(username):
+    calendar = load_calendar()
+    cancelled = []
+    for date, slots in calendar.items():
+        for time, user in slots.items():
+            if user == username:
+                slots[time] = None
+                cancelled.append(f"{date} at {time}")
+    if cancelled:
+        save_calendar(calendar)
+    return cancelled
+
+def next_free_slot(date_str, after=None):
+    calendar = ensure_day_exists(load_calendar(), date_str)
+    for time, user in calendar[date_str].items():
+        if user is None and (after is None or time > after):
+            return time
+    return None
@@ -1,11 +1,13 @@
 import boto3
 import json
 import logging
+from contextvars import ContextVar
+from datetime import datetime
 from typing import Dict, List, Tuple
 from dotenv import load_dotenv
 import os
-import re
 from chatbot.calendar_utils import book_slot
+from chatbot.datetime_parser import clinic_now, describe_resolution, extract_canonical_datetime, resolve_datetime
 
 # Load environment variables from .env file
 load_dotenv()
@@ -33,8 +35,8 @@ class BedrockLLM:
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
 
-    def generate_response(self, messages: List[Dict], system_prompt: str = None) -> str:
-        """Generate response using Claude via Bedrock"""
+    def generate_response(self, messages: List[Dict], system_prompt: str = None, raise_errors: bool = False) -> str:
+        """Generate response using Claude via Bedrock; errors become an apology unless raise_errors is set"""
         try:
             payload = {
                 "anthropic_version": "bedrock-2023-05-31",  
@@ -57,21 +59,31 @@ class BedrockLLM:
             
         except Exception as e:
             self.logger.error(f"Error calling Bedrock: {str(e)}")
+            if raise_errors:
+                raise
             return f"I apologize, but I'm experiencing technical difficulties: {str(e)}"
 
 def extract_datetime(text):
-    """Very basic date & time extractor — can be replaced by LLM JSON output."""
-    date_match = re.search(r"(\d{4}-\d{2}-\d{2})", text)
-    time_match = re.search(r"([01]?\d|2[0-3]):[0-5]\d", text)
+    """Extract the confirmed YYYY-MM-DD date and HH:MM slot from an assistant reply.
 
-    if date_match and time_match:
-        return date_match.group(1), time_match.group(0)
-    return None, None
+    Relative phrases are deliberately ignored here: a reply may mention
+    "Tuesday at 3 PM" while still asking the user to confirm.
+    """
+    return extract_canonical_datetime(text)
 
 # Initialize the LLM instance
 llm = BedrockLLM()
 
-def call_llm(user_input: str, context: Dict) -> Tuple[str, Dict]:
+# Username and session of the turn being sent to the LLM, so call recorders can attribute it
+current_username: ContextVar = ContextVar("current_username", default=None)
+current_session_id: ContextVar = ContextVar("current_session_id", default=None)
+
+SCHEDULING_KEYWORDS = ['appointment', 'schedule', 'book']
+
+def is_scheduling_request(user_input: str) -> bool:
+    return any(word in user_input.lower() for word in SCHEDULING_KEYWORDS)
+
+def build_system_prompt(user_input: str, now: datetime = None) -> str:
     system_prompt = """You are a helpful medical appointment assistant. You can:
     - Schedule appointments (between 10:00 and 16:00 only, 30-min slots)
     - Provide general health info
@@ -79,11 +91,27 @@ def call_llm(user_input: str, context: Dict) -> Tuple[str, Dict]:
 
     Always respond with clarity. If a user asks to schedule, mention the confirmed date and time in the format YYYY-MM-DD and HH:MM."""
 
+    # Resolve dates locally so the model does not need extra turns to normalize them
+    now = now or clinic_now()
+    system_prompt += f"\n\n    Today is {now.strftime('%A, %Y-%m-%d')} (clinic time)."
+    resolution_hint = describe_resolution(resolve_datetime(user_input, now=now))
+    if resolution_hint:
+        system_prompt += f" {resolution_hint}"
+    return system_prompt
+
+def call_llm(user_input: str, context: Dict) -> Tuple[str, Dict]:
     try:
+        system_prompt = build_system_prompt(user_input)
         messages = context.get('conversation_history', [])
         messages.append({"role": "user", "content": user_input})
 
-        response = llm.generate_response(messages, system_prompt)
+        token = current_username.set(context.get('username'))
+        session_token = current_session_id.set(context.get('session_id'))
+        try:
+            response = llm.generate_response(messages, system_prompt)
+        finally:
+            current_session_id.reset(session_token)
+            current_username.reset(token)
 
         # Append assistant's response
         messages.append({"role": "assistant", "content": response})
@@ -92,7 +120,7 @@ def call_llm(user_input: str, context: Dict) -> Tuple[str, Dict]:
         updated_context['last_interaction'] = user_input
 
         # Extract and book appointment if applicable
-        if any(word in user_input.lower() for word in ['appointment', 'schedule', 'book']):
+        if is_scheduling_request(user_input):
             date, time = extract_datetime(response)
             if date and time:
                 success, booking_msg = book_slot(context.get('username', 'unknown'), date, time)
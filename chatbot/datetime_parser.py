@@ -0,0 +1,286 @@
+# datetime_parser.py
+import os
+import re
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from chatbot.calendar_utils import CLINIC_OPEN, CLINIC_CLOSE, SLOT_MINUTES
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+# IANA name such as "America/New_York"; unset means the server's local time
+CLINIC_TIMEZONE = os.getenv("CLINIC_TIMEZONE")
+
+_MONTHS = {
+    'january': 1, 'jan': 1, 'february': 2, 'feb': 2, 'march': 3, 'mar': 3, 'april': 4, 'apr': 4,
+    'may': 5, 'june': 6, 'jun': 6, 'july': 7, 'jul': 7, 'august': 8, 'aug': 8,
+    'september': 9, 'sept': 9, 'sep': 9, 'october': 10, 'oct': 10, 'november': 11, 'nov': 11,
+    'december': 12, 'dec': 12,
+}
+_WEEKDAYS = {
+    'monday': 0, 'mon': 0, 'tuesday': 1, 'tues': 1, 'tue': 1, 'wednesday': 2, 'wed': 2,
+    'thursday': 3, 'thurs': 3, 'thu': 3, 'friday': 4, 'fri': 4, 'saturday': 5, 'sat': 5,
+    'sunday': 6, 'sun': 6,
+}
+_NUMBERS = {'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7}
+# Clinic-relative windows for parts of the day
+_PARTS_OF_DAY = {'morning': (CLINIC_OPEN, "12:00"), 'afternoon': ("12:00", CLINIC_CLOSE), 'evening': ("17:00", "21:00")}
+
+_MONTH = "(" + "|".join(sorted(_MONTHS, key=len, reverse=True)) + r")\.?"
+_WEEKDAY = "(" + "|".join(sorted(_WEEKDAYS, key=len, reverse=True)) + ")"
+_ORDINAL = r"(\d{1,2})(?:st|nd|rd|th)?"
+_CLOCK = r"(1[0-2]|0?[1-9])(?::([0-5]\d))?"
+
+# Compiled once at import; every parse is a handful of searches over short text
+_ISO_DATE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+_MONTH_DAY = re.compile(r"\b" + _MONTH + r"\s+" + _ORDINAL + r"\b(?:,?\s+(\d{4})\b)?")
+_DAY_MONTH = re.compile(r"\b" + _ORDINAL + r"\s+(?:of\s+)?" + _MONTH + r"(?:,?\s+(\d{4})\b)?")
+_SLASH_DATE = re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{4}|\d{2}))?\b")
+_RELATIVE_DAY = re.compile(r"\b(day after tomorrow|today|tonight|tomorrow)\b")
+_IN_DAYS = re.compile(r"\bin\s+(\d+|an?|one|two|three|four|five|six|seven)\s+(day|week)s?\b")
+_WEEKDAY_REF = re.compile(r"\b(?:(next|this|coming)\s+)?" + _WEEKDAY + r"\b")
+_TIME_RANGE = re.compile(r"\b(?:between|from)\s+" + _CLOCK + r"\s*(?:([ap])\.?m\.?)?\s*(?:and|to|-)\s*"
+                         + _CLOCK + r"\s*(?:([ap])\.?m\.?)?")
+_TIME_12H = re.compile(r"\b" + _CLOCK + r"\s*([ap])\.?m\b\.?")
+_TIME_24H = re.compile(r"\b([01]?\d|2[0-3]):([0-5]\d)\b")
+_NOON = re.compile(r"\b(noon|midday)\b")
+_AT_HOUR = re.compile(r"\bat\s+(1[0-2]|[1-9])\b(?!\s*[:/\-])")
+_PART_OF_DAY = re.compile(r"\b(morning|afternoon|evening)\b")
+
+
+def clinic_now() -> datetime:
+    """Current time in the clinic timezone"""
+    if CLINIC_TIMEZONE and ZoneInfo is not None:
+        return datetime.now(ZoneInfo(CLINIC_TIMEZONE)).replace(tzinfo=None)
+    return datetime.now()
+
+
+def _minutes(hhmm: str) -> int:
+    return int(hhmm[:2]) * 60 + int(hhmm[3:])
+
+
+def _hhmm(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+_OPEN, _CLOSE = _minutes(CLINIC_OPEN), _minutes(CLINIC_CLOSE)
+
+
+def snap_to_slot(minutes: int) -> int:
+    """Round to the nearest slot boundary"""
+    return (minutes + SLOT_MINUTES // 2) // SLOT_MINUTES * SLOT_MINUTES
+
+
+def _to_24h(hour: int, minute: int, meridiem: Optional[str]) -> int:
+    if meridiem == 'p' and hour != 12:
+        hour += 12
+    elif meridiem == 'a' and hour == 12:
+        hour = 0
+    elif meridiem is None and 1 <= hour < 7:
+        # A bare "3" or "3:00" during clinic hours means the afternoon
+        hour += 12
+    return hour * 60 + minute
+
+
+def _safe_date(year: int, month: int, day: int) -> Optional[date]:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _without_year(today: date, month: int, day: int) -> Optional[date]:
+    """Dates without a year refer to the next occurrence"""
+    candidate = _safe_date(today.year, month, day)
+    if candidate is not None and candidate < today:
+        candidate = _safe_date(today.year + 1, month, day)
+    return candidate
+
+
+def _resolve_date(text: str, today: date, allow_relative: bool) -> Optional[date]:
+    m = _ISO_DATE.search(text)
+    if m:
+        return _safe_date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+
+    m = _MONTH_DAY.search(text)
+    if m:
+        month, day, year = _MONTHS[m.group(1)], int(m.group(2)), m.group(3)
+        return _safe_date(int(year), month, day) if year else _without_year(today, month, day)
+
+    m = _DAY_MONTH.search(text)
+    if m:
+        day, month, year = int(m.group(1)), _MONTHS[m.group(2)], m.group(3)
+        return _safe_date(int(year), month, day) if year else _without_year(today, month, day)
+
+    m = _SLASH_DATE.search(text)
+    if m:
+        # US order: month/day[/year]
+        month, day, year = int(m.group(1)), int(m.group(2)), m.group(3)
+        if year:
+            return _safe_date(int(year) + (2000 if len(year) == 2 else 0), month, day)
+        return _without_year(today, month, day)
+
+    if not allow_relative:
+        return None
+
+    m = _RELATIVE_DAY.search(text)
+    if m:
+        word = m.group(1)
+        offset = 2 if word == 'day after tomorrow' else 1 if word == 'tomorrow' else 0
+        return today + timedelta(days=offset)
+
+    m = _IN_DAYS.search(text)
+    if m:
+        count = int(m.group(1)) if m.group(1).isdigit() else _NUMBERS[m.group(1)]
+        try:
+            return today + timedelta(days=count * (7 if m.group(2) == 'week' else 1))
+        except OverflowError:
+            # "in 9999999 days" is past date.max
+            return None
+
+    m = _WEEKDAY_REF.search(text)
+    if m:
+        # "this friday" may be today; "friday", "next friday" and "coming friday" are after today
+        ahead = (_WEEKDAYS[m.group(2)] - today.weekday()) % 7
+        if ahead == 0 and m.group(1) != 'this':
+            ahead = 7
+        return today + timedelta(days=ahead)
+
+    return None
+
+
+def _next_weekday_alternative(text: str, today: date, resolved: Optional[date]) -> Optional[date]:
+    """On a Monday, "next tuesday" may mean tomorrow or the Tuesday after; return the later reading"""
+    m = _WEEKDAY_REF.search(text)
+    if not m or m.group(1) != 'next' or resolved is None:
+        return None
+    weekday = _WEEKDAYS[m.group(2)]
+    # Only ambiguous while the weekday is still ahead in the current week
+    if weekday > today.weekday() and resolved == today + timedelta(days=weekday - today.weekday()):
+        return resolved + timedelta(days=7)
+    return None
+
+
+def _resolve_time(text: str) -> Tuple[Optional[int], Optional[Tuple[int, int]]]:
+    """Return (exact minutes, None) or (None, (window start, window end))"""
+    m = _TIME_RANGE.search(text)
+    if m:
+        end_meridiem = m.group(6)
+        start = _to_24h(int(m.group(1)), int(m.group(2) or 0), m.group(3) or end_meridiem)
+        end = _to_24h(int(m.group(4)), int(m.group(5) or 0), end_meridiem)
+        if start < end:
+            return None, (start, end)
+
+    m = _TIME_12H.search(text)
+    if m:
+        return _to_24h(int(m.group(1)), int(m.group(2) or 0), m.group(3)), None
+
+    if _NOON.search(text):
+        return 12 * 60, None
+
+    m = _TIME_24H.search(text)
+    if m:
+        hour, minute = int(m.group(1)), int(m.group(2))
+        # "3:00" gets the afternoon heuristic; zero-padded "03:00" is taken literally
+        return (_to_24h(hour, minute, None) if len(m.group(1)) == 1 else hour * 60 + minute), None
+
+    m = _AT_HOUR.search(text)
+    if m:
+        return _to_24h(int(m.group(1)), 0, None), None
+
+    m = _PART_OF_DAY.search(text)
+    if m:
+        start, end = _PARTS_OF_DAY[m.group(1)]
+        return None, (_minutes(start), _minutes(end))
+
+    if 'tonight' in text:
+        return None, (_minutes(_PARTS_OF_DAY['evening'][0]), _minutes(_PARTS_OF_DAY['evening'][1]))
+
+    return None, None
+
+
+def resolve_datetime(text: str, now: datetime = None, allow_relative: bool = True) -> Dict:
+    """Resolve a date/time expression to the clinic slot grid without calling the LLM.
+
+    Returns a dict with 'date' (YYYY-MM-DD), 'time' (HH:MM, snapped to the
+    slot grid), 'window' (HH:MM start/end for ranges such as "afternoon"),
+    'slots' (bookable slots matching the time or window),
+    'in_clinic_hours', 'snapped' (the stated time was moved to the grid)
+    and 'alternative_date' (another reading of an ambiguous phrase such
+    as "next tuesday"). Parts that could not be resolved are None.
+    Relative expressions ("tomorrow", "next tuesday") are only resolved
+    when allow_relative is set.
+    """
+    text = text.lower()
+    today = (now or clinic_now()).date()
+
+    resolved_date = _resolve_date(text, today, allow_relative)
+    exact, window = _resolve_time(text)
+
+    result = {
+        'date': resolved_date.isoformat() if resolved_date else None,
+        'time': None,
+        'window': None,
+        'slots': [],
+        'in_clinic_hours': None,
+        'snapped': False,
+        'alternative_date': None,
+    }
+    alternative = _next_weekday_alternative(text, today, resolved_date) if allow_relative else None
+    if alternative:
+        result['alternative_date'] = alternative.isoformat()
+    if exact is not None:
+        snapped = snap_to_slot(exact)
+        result['snapped'] = snapped != exact
+        exact = snapped
+        result['time'] = _hhmm(exact)
+        result['in_clinic_hours'] = _OPEN <= exact < _CLOSE
+        if result['in_clinic_hours']:
+            result['slots'] = [result['time']]
+    elif window is not None:
+        start = -(-window[0] // SLOT_MINUTES) * SLOT_MINUTES
+        end = window[1] // SLOT_MINUTES * SLOT_MINUTES
+        result['window'] = (_hhmm(start), _hhmm(end))
+        result['slots'] = [_hhmm(m) for m in range(max(start, _OPEN), min(end, _CLOSE), SLOT_MINUTES)]
+        result['in_clinic_hours'] = bool(result['slots'])
+    return result
+
+
+def describe_resolution(resolution: Dict) -> Optional[str]:
+    """One-line summary of a resolution for the LLM system prompt"""
+    if not resolution['date'] and not resolution['time'] and not resolution['window']:
+        return None
+    when = resolution['date'] or "an unspecified date"
+    if resolution['time']:
+        when += f" at {resolution['time']}"
+    elif resolution['window']:
+        when += f" between {resolution['window'][0]} and {resolution['window'][1]}"
+    if resolution.get('alternative_date'):
+        when += f" (or {resolution['alternative_date']}; the date is ambiguous, confirm it with the user)"
+    if resolution['in_clinic_hours'] is False:
+        return f"The user's requested time resolves to {when}, which is outside clinic hours."
+    if resolution['window'] and resolution['slots']:
+        return f"The user's requested time resolves to {when} (candidate slots: {', '.join(resolution['slots'])})."
+    return f"The user's requested time resolves to {when}."
+
+
+def extract_canonical_datetime(text: str) -> Tuple[Optional[str], Optional[str]]:
+    """Fast path for the YYYY-MM-DD / HH:MM format the assistant is told to confirm in.
+
+    The time is taken as confirmed to the user, so one that is off the
+    slot grid or outside clinic hours yields (None, None) rather than a
+    different slot.
+    """
+    date_match = _ISO_DATE.search(text)
+    time_match = _TIME_24H.search(text)
+    if not date_match or not time_match:
+        return None, None
+    if _safe_date(int(date_match.group(1)), int(date_match.group(2)), int(date_match.group(3))) is None:
+        return None, None
+    minutes = int(time_match.group(1)) * 60 + int(time_match.group(2))
+    if minutes % SLOT_MINUTES or not _OPEN <= minutes < _CLOSE:
+        return None, None
+    return date_match.group(0), _hhmm(minutes)
@@ -0,0 +1,222 @@
+# encryption.py
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from cryptography.fernet import Fernet, InvalidToken
+
+SECRET_KEY_FILE = os.getenv("SECRET_KEY_FILE", "secret.key")
+# "auto" encrypts whenever SECRET_KEY_FILE exists; "on" requires it; "off" writes plaintext
+ENCRYPTION_AT_REST = os.getenv("ENCRYPTION_AT_REST", "auto").lower()
+DECRYPT_CACHE_SIZE = int(os.getenv("DECRYPT_CACHE_SIZE", "1024"))
+
+# Canonical record encoding, built once: json.dumps() with options builds a new encoder per call
+_record_encoder = json.JSONEncoder(ensure_ascii=False, sort_keys=True)
+
+
+def load_key(path: str = SECRET_KEY_FILE) -> bytes:
+    with open(path, "rb") as f:
+        return f.read().strip()
+
+
+def is_envelope(value) -> bool:
+    """Check whether a stored value is an encrypted record envelope"""
+    return isinstance(value, dict) and "ct" in value and "dek" in value
+
+
+class RecordCipher:
+    """Per-record envelope encryption with an LRU cache of decrypted records.
+
+    Each record is encrypted with its own Fernet data key, which is in turn
+    encrypted with the master key. Updating one record therefore never
+    touches the ciphertext of any other record.
+    """
+
+    def __init__(self, master_key: bytes, cache_size: int = DECRYPT_CACHE_SIZE):
+        self._master = Fernet(master_key)
+        self.key_id = hashlib.sha256(master_key).hexdigest()[:8]
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, ciphertext: str, plaintext: str):
+        with self._lock:
+            self._cache[ciphertext] = plaintext
+            self._cache.move_to_end(ciphertext)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _cached(self, ciphertexts: List[str]) -> List[Optional[str]]:
+        with self._lock:
+            found = []
+            for ciphertext in ciphertexts:
+                plaintext = self._cache.get(ciphertext)
+                if plaintext is not None:
+                    self._cache.move_to_end(ciphertext)
+                found.append(plaintext)
+            misses = found.count(None)
+            self.hits += len(found) - misses
+            self.misses += misses
+            return found
+
+    def seal(self, plaintext: str) -> Dict:
+        """Encrypt one record into an envelope"""
+        data_key = Fernet.generate_key()
+        ciphertext = Fernet(data_key).encrypt(plaintext.encode("utf-8")).decode("ascii")
+        self._remember(ciphertext, plaintext)
+        return {
+            "v": 1,
+            "kid": self.key_id,
+            "dek": self._master.encrypt(data_key).decode("ascii"),
+            "ct": ciphertext,
+        }
+
+    def open(self, envelope: Dict) -> str:
+        """Decrypt an envelope, serving hot records from the cache"""
+        return self.open_many([envelope])[0]
+
+    def open_many(self, envelopes: List[Dict]) -> List[str]:
+        """Decrypt several envelopes with a single cache pass"""
+        plaintexts = self._cached([envelope["ct"] for envelope in envelopes])
+        for i, plaintext in enumerate(plaintexts):
+            if plaintext is None:
+                envelope = envelopes[i]
+                try:
+                    data_key = self._master.decrypt(envelope["dek"].encode("ascii"))
+                    plaintext = Fernet(data_key).decrypt(envelope["ct"].encode("ascii")).decode("utf-8")
+                except InvalidToken as e:
+                    raise ValueError(f"Record could not be decrypted with key {self.key_id}.") from e
+                self._remember(envelope["ct"], plaintext)
+                plaintexts[i] = plaintext
+        return plaintexts
+
+    def peek(self, envelope: Dict) -> Optional[str]:
+        """Return the cached plaintext of an envelope without decrypting"""
+        with self._lock:
+            return self._cache.get(envelope["ct"])
+
+
+_cipher = None
+_cipher_lock = threading.Lock()
+
+
+def get_record_cipher() -> Optional[RecordCipher]:
+    """Return the process-wide cipher, or None when encryption at rest is off"""
+    global _cipher
+    with _cipher_lock:
+        if _cipher is None and ENCRYPTION_AT_REST != "off":
+            if os.path.exists(SECRET_KEY_FILE):
+                _cipher = RecordCipher(load_key())
+            elif ENCRYPTION_AT_REST == "on":
+                raise ValueError(f"ENCRYPTION_AT_REST=on but {SECRET_KEY_FILE} does not exist.")
+        return _cipher
+
+
+def set_record_cipher(cipher: Optional[RecordCipher]) -> None:
+    """Override the process-wide cipher"""
+    global _cipher
+    with _cipher_lock:
+        _cipher = cipher
+
+
+def _snapshot(value, plaintext: str):
+    """Private copy of a decoded record; shallow copies suffice for flat records"""
+    if isinstance(value, dict) and not any(isinstance(v, (dict, list)) for v in value.values()):
+        return dict(value)
+    if isinstance(value, list) and not any(isinstance(v, (dict, list)) for v in value):
+        return list(value)
+    return json.loads(plaintext)
+
+
+def _decode(stored: Dict, cipher: RecordCipher = None, with_snapshots: bool = False):
+    keys = [key for key, value in stored.items() if is_envelope(value)]
+    if not keys:
+        return dict(stored), {}
+    cipher = cipher or get_record_cipher()
+    if cipher is None:
+        raise ValueError("Records are encrypted but no key is available.")
+
+    # Parse all records in one pass instead of one json.loads() per record
+    plaintexts = cipher.open_many([stored[key] for key in keys])
+    decoded = dict(zip(keys, json.loads("[" + ",".join(plaintexts) + "]")))
+    snapshots = {}
+    if with_snapshots:
+        snapshots = {key: _snapshot(decoded[key], plaintext) for key, plaintext in zip(keys, plaintexts)}
+    records = {key: decoded[key] if key in decoded else value for key, value in stored.items()}
+    return records, snapshots
+
+
+def _encode(records: Dict, cipher: RecordCipher, previous: Dict, snapshots: Dict):
+    stored = {}
+    new_snapshots = {}
+    for key, value in records.items():
+        envelope = previous.get(key)
+        snapshot = snapshots.get(key)
+        if snapshot is not None and is_envelope(envelope) and snapshot == value:
+            stored[key] = envelope
+            new_snapshots[key] = snapshot
+            continue
+        plaintext = _record_encoder.encode(value)
+        if is_envelope(envelope) and cipher.peek(envelope) == plaintext:
+            stored[key] = envelope
+        else:
+            stored[key] = cipher.seal(plaintext)
+        new_snapshots[key] = _snapshot(value, plaintext)
+    return stored, new_snapshots
+
+
+def decode_records(stored: Dict, cipher: RecordCipher = None) -> Dict:
+    """Decrypt every enveloped value of a stored mapping; plaintext values pass through"""
+    return _decode(stored, cipher)[0]
+
+
+def encode_records(records: Dict, cipher: RecordCipher, previous: Dict = None) -> Dict:
+    """Encrypt each value of a mapping, reusing envelopes whose content is unchanged"""
+    return _encode(records, cipher, previous or {}, {})[0]
+
+
+# Envelopes and decoded snapshots last seen per file. Comparing a record with its
+# snapshot is much cheaper than re-encoding it to detect whether it changed.
+_envelopes = OrderedDict()
+_envelopes_lock = threading.Lock()
+_ENVELOPE_FILES = 256
+
+
+def _remember_envelopes(path: str, stored: Dict, snapshots: Dict):
+    with _envelopes_lock:
+        _envelopes[path] = (stored, snapshots)
+        _envelopes.move_to_end(path)
+        while len(_envelopes) > _ENVELOPE_FILES:
+            _envelopes.popitem(last=False)
+
+
+def load_json_records(path: str) -> Dict:
+    """Load a JSON object from disk, decrypting enveloped records"""
+    with open(path, "r", encoding="utf-8") as f:
+        stored = json.load(f)
+    records, snapshots = _decode(stored, with_snapshots=True)
+    if snapshots:
+        _remember_envelopes(path, stored, snapshots)
+    return records
+
+
+def save_json_records(path: str, records: Dict, indent: int = 2) -> None:
+    """Write a JSON object to disk, one envelope per top-level key when encryption is on"""
+    cipher = get_record_cipher()
+    if cipher is None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(records, f, indent=indent, ensure_ascii=False)
+        return
+
+    with _envelopes_lock:
+        previous, snapshots = _envelopes.get(path, ({}, {}))
+    stored, snapshots = _encode(records, cipher, previous, snapshots)
+    # Envelopes are not human-readable, so skip the slow pure-Python indented encoder
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(stored))
+    _remember_envelopes(path, stored, snapshots)
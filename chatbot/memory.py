@@ -1,15 +1,294 @@
-from datetime import datetime
-from typing import Dict, List
+import json
+import os
+from abc import ABC, abstractmethod
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from chatbot.encryption import get_record_cipher, is_envelope, save_json_records
+
+# Stored sessions expire after this long without a put; check_session() in app.py also
+# uses it, but counts from login rather than from the last activity
+SESSION_TIMEOUT = timedelta(minutes=30)
+
+SESSION_STORE_BACKEND = os.getenv("SESSION_STORE_BACKEND", "file")
+SESSION_DB_FILE = os.getenv("SESSION_DB_FILE", "./data/sessions.db")
+SESSION_REDIS_URL = os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0")
+# Only ids in the format init_context generates are accepted from clients
+SESSION_ID_PATTERN = re.compile(r"session_\d{8}_\d{6}_[0-9a-f]{8}")
+
+# Session files of the default file backend; the retention sweeper only looks here
+SESSION_DIR = os.getenv("SESSION_DIR", "./data/sessions")
+
+
+def _serialize_context(context: Dict, encrypt: bool = False) -> str:
+    """Serialize context to a JSON string, sealed in an envelope when encrypting"""
+    save_data = context.copy()
+    if isinstance(save_data.get('session_start'), datetime):
+        save_data['session_start'] = save_data['session_start'].isoformat()
+    data = json.dumps(save_data, ensure_ascii=False)
+    cipher = get_record_cipher() if encrypt else None
+    return json.dumps(cipher.seal(data)) if cipher is not None else data
+
+
+def _deserialize_context(data: str) -> Dict:
+    """Rebuild a context dict from its JSON string"""
+    context = json.loads(data)
+    if is_envelope(context):
+        cipher = get_record_cipher()
+        if cipher is None:
+            raise ValueError("Stored session is encrypted but no key is available.")
+        context = json.loads(cipher.open(context))
+    if isinstance(context.get('session_start'), str):
+        try:
+            context['session_start'] = datetime.fromisoformat(context['session_start'])
+        except ValueError:
+            pass
+    return context
+
+
+class SessionStore(ABC):
+    """Base interface for session context persistence shared across replicas"""
+
+    name = "base"
+    # Stores that persist outside this process encrypt contexts at rest
+    encrypt_at_rest = True
+
+    def __init__(self, ttl: timedelta = SESSION_TIMEOUT, clock=time.time):
+        self.ttl_seconds = ttl.total_seconds()
+        self.clock = clock
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        """Return the stored context, or None if missing or expired"""
+        data = self._get(session_id)
+        return _deserialize_context(data) if data is not None else None
+
+    def put(self, session_id: str, context: Dict) -> None:
+        """Store the context and reset its expiry"""
+        self._put(session_id, _serialize_context(context, encrypt=self.encrypt_at_rest))
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """Remove the session if it exists"""
+
+    def purge_expired(self) -> int:
+        """Drop expired sessions and return how many were removed"""
+        return 0
+
+    def delete_user_sessions(self, username: str) -> int:
+        """Remove every live session owned by username and return how many were removed"""
+        removed = 0
+        for session_id in self._session_ids():
+            try:
+                context = self.get(session_id)
+            except ValueError:
+                continue
+            if context is not None and context.get('username') == username:
+                self.delete(session_id)
+                removed += 1
+        return removed
+
+    @abstractmethod
+    def _session_ids(self) -> List[str]:
+        """Ids of every stored session"""
+
+    @abstractmethod
+    def _get(self, session_id: str) -> Optional[str]:
+        """Return the serialized context, or None if missing or expired"""
+
+    @abstractmethod
+    def _put(self, session_id: str, data: str) -> None:
+        """Store the serialized context and reset its expiry"""
+
+
+class InMemorySessionStore(SessionStore):
+    """Process-local LRU store, suitable for a single replica"""
+
+    name = "memory"
+    encrypt_at_rest = False
+
+    def __init__(self, max_entries: int = 1000, ttl: timedelta = SESSION_TIMEOUT, clock=time.time):
+        super().__init__(ttl, clock)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, session_id):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at <= self.clock():
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+            return data
+
+    def _put(self, session_id, data):
+        with self._lock:
+            self._entries[session_id] = (self.clock() + self.ttl_seconds, data)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def _session_ids(self):
+        with self._lock:
+            return list(self._entries)
+
+    def purge_expired(self):
+        now = self.clock()
+        with self._lock:
+            expired = [sid for sid, (expires_at, _) in self._entries.items() if expires_at <= now]
+            for sid in expired:
+                del self._entries[sid]
+        return len(expired)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Local SQLite store, shared by processes on the same host"""
+
+    name = "sqlite"
+
+    def __init__(self, db_file: str = SESSION_DB_FILE, ttl: timedelta = SESSION_TIMEOUT, clock=time.time):
+        super().__init__(ttl, clock)
+        self.db_file = db_file
+        if db_file != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_file)), exist_ok=True)
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _get(self, session_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM sessions WHERE session_id = ? AND expires_at > ?",
+                (session_id, self.clock())
+            ).fetchone()
+        return row[0] if row else None
+
+    def _put(self, session_id, data):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, data, expires_at) VALUES (?, ?, ?)",
+                (session_id, data, self.clock() + self.ttl_seconds)
+            )
+
+    def delete(self, session_id):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def _session_ids(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT session_id FROM sessions")]
+
+    def purge_expired(self):
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (self.clock(),))
+        return cursor.rowcount
+
+
+class RedisSessionStore(SessionStore):
+    """Shared store backed by any client exposing Redis get/set(ex=)/delete/scan_iter"""
+
+    name = "redis"
+
+    def __init__(self, client, prefix: str = "medical_session:", ttl: timedelta = SESSION_TIMEOUT):
+        super().__init__(ttl)
+        self.client = client
+        self.prefix = prefix
+
+    def _get(self, session_id):
+        data = self.client.get(self.prefix + session_id)
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        return data
+
+    def _put(self, session_id, data):
+        # Redis expires keys itself, so no purge pass is needed
+        self.client.set(self.prefix + session_id, data, ex=int(self.ttl_seconds))
+
+    def delete(self, session_id):
+        self.client.delete(self.prefix + session_id)
+
+    def _session_ids(self):
+        ids = []
+        for key in self.client.scan_iter(match=f"{self.prefix}*"):
+            if isinstance(key, bytes):
+                key = key.decode('utf-8')
+            ids.append(key[len(self.prefix):])
+        return ids
+
+
+def build_session_store(backend: str = None) -> Optional[SessionStore]:
+    """Create the session store for the configured backend ("file" means none)"""
+    backend = (backend or SESSION_STORE_BACKEND).lower()
+    if backend == "file":
+        return None
+    if backend == "memory":
+        return InMemorySessionStore()
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    if backend == "redis":
+        try:
+            import redis
+        except ImportError as e:
+            raise ValueError("SESSION_STORE_BACKEND=redis requires the 'redis' package.") from e
+        return RedisSessionStore(redis.Redis.from_url(SESSION_REDIS_URL))
+    raise ValueError(f"Unknown SESSION_STORE_BACKEND: {backend}")
+
+
+_session_store = None
+_session_store_lock = threading.Lock()
+
+
+def get_session_store() -> Optional[SessionStore]:
+    """Return the process-wide session store, creating it on first use"""
+    global _session_store
+    with _session_store_lock:
+        if _session_store is None:
+            _session_store = build_session_store()
+        return _session_store
+
+
+def set_session_store(store: Optional[SessionStore]) -> None:
+    """Override the process-wide session store"""
+    global _session_store
+    with _session_store_lock:
+        _session_store = store
+
+
+def init_context(session_id: str = None, store: SessionStore = None, username: str = None) -> Dict:
+    """Initialize conversation context, resuming a stored session owned by username when available.
+
+    session_id usually comes from the client, so it is never reused for a
+    new session: anything that cannot be resumed gets a freshly generated id.
+    """
+    if session_id and store is not None and SESSION_ID_PATTERN.fullmatch(session_id):
+        stored = store.get(session_id)
+        if stored is not None and stored.get('username') == username:
+            return stored
 
-def init_context() -> Dict:
-    """Initialize conversation context for new session"""
     return {
         'conversation_history': [],
         'session_start': datetime.now(),
         'appointments': [],
         'user_preferences': {},
         'last_interaction': None,
-        'session_id': f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        'session_id': f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
     }
 
 def get_conversation_summary(context: Dict) -> str:
@@ -17,13 +296,13 @@ def get_conversation_summary(context: Dict) -> str:
     history = context.get('conversation_history', [])
     if not history:
         return "No conversation history yet."
-    
+
     summary = f"Conversation started: {context.get('session_start', 'Unknown')}\n"
     summary += f"Total messages: {len(history)}\n"
-    
+
     if context.get('appointments'):
         summary += f"Appointments discussed: {len(context['appointments'])}\n"
-    
+
     return summary
 
 def clear_context(context: Dict) -> Dict:
@@ -33,24 +312,32 @@ def clear_context(context: Dict) -> Dict:
     new_context['user_preferences'] = context.get('user_preferences', {})
     return new_context
 
-def save_context_to_file(context: Dict, filename: str = None, username: str = None) -> str:
-    """Save context to JSON file"""
-    import json
-    
+def save_context_to_file(context: Dict, filename: str = None, username: str = None,
+                         store: SessionStore = None) -> str:
+    """Save context to the session store, or to a JSON file when none is configured"""
+    store = store if store is not None else get_session_store()
+    if store is not None:
+        try:
+            store.put(context.get('session_id', 'unknown'), context)
+            return f"Session saved to {store.name} store"
+        except Exception as e:
+            return f"Failed to save session: {str(e)}"
+
     if not filename:
         session_id = context.get('session_id', 'unknown')
         safe_username = username or "anonymous"
         filename = f"{safe_username}_session_{session_id}.json"
-    
+    filename = os.path.join(SESSION_DIR, os.path.basename(filename))
+
     try:
+        os.makedirs(SESSION_DIR, exist_ok=True)
         # Prepare data for JSON serialization
         save_data = context.copy()
         if 'session_start' in save_data:
             save_data['session_start'] = save_data['session_start'].isoformat()
-        
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(save_data, f, indent=2, ensure_ascii=False)
-        
+
+        save_json_records(filename, save_data)
+
         return f"Session saved to {filename}"
     except Exception as e:
         return f"Failed to save session: {str(e)}"
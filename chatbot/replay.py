@@ -0,0 +1,366 @@
+# replay.py
+import argparse
+import glob
+import io
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List
+
+from chatbot import calendar_utils, conversation
+from chatbot.datetime_parser import clinic_now
+from chatbot.encryption import get_record_cipher, is_envelope, load_json_records
+
+CASSETTE_VERSION = 1
+
+# Set LLM_RECORDING=on to record every Bedrock call the app makes, one cassette per day
+LLM_RECORDING = os.getenv("LLM_RECORDING", "off").lower() == "on"
+RECORDINGS_DIR = os.getenv("LLM_RECORDINGS_DIR", "./data/recordings")
+RECORDING_PATTERN = "recording_*.jsonl"
+
+# Default regression thresholds for compare_reports
+LATENCY_TOLERANCE = 0.5     # relative growth allowed in per-turn local latency
+LATENCY_SLACK_MS = 5.0      # absolute growth always allowed, to absorb timer noise
+TOKEN_TOLERANCE = 0.1       # relative growth allowed in per-turn token counts
+
+# Serialises recording appends with purges that rewrite the same files
+_cassette_lock = threading.Lock()
+
+# Request fields compared between the recording and the replay
+_REQUEST_FIELDS = ('system', 'messages', 'max_tokens', 'temperature')
+
+logger = logging.getLogger(__name__)
+
+
+def _write_line(f, record: Dict):
+    # Each line is sealed on its own so recordings stay append-only
+    line = json.dumps(record, ensure_ascii=False)
+    cipher = get_record_cipher()
+    if cipher is not None:
+        line = json.dumps(cipher.seal(line))
+    f.write(line + "\n")
+
+
+def _read_line(line: str) -> Dict:
+    record = json.loads(line)
+    if is_envelope(record):
+        cipher = get_record_cipher()
+        if cipher is None:
+            raise ValueError("Cassette is encrypted but no key is configured.")
+        record = json.loads(cipher.open(record))
+    return record
+
+
+def load_cassette(path: str) -> Dict:
+    """Read a cassette: a header line followed by one recorded interaction per line"""
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = [_read_line(line) for line in f if line.strip()]
+    if not lines or lines[0].get('cassette') != CASSETTE_VERSION:
+        raise ValueError(f"{path} is not a version {CASSETTE_VERSION} cassette.")
+    return {'header': lines[0], 'interactions': lines[1:]}
+
+
+def save_cassette(path: str, cassette: Dict) -> None:
+    """Write a cassette, encrypting each line when encryption at rest is on"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        _write_line(f, cassette['header'])
+        for interaction in cassette['interactions']:
+            _write_line(f, interaction)
+    os.replace(tmp_path, path)
+
+
+def _calendar_occupancy() -> Dict:
+    """The calendar with usernames replaced, which is all a replay needs"""
+    return {
+        date: {time: None if user is None else "booked" for time, user in slots.items()}
+        for date, slots in calendar_utils.load_calendar().items()
+    }
+
+
+class RecordingClient:
+    """Wraps a bedrock-runtime client and appends every invoke_model call to the day's cassette"""
+
+    def __init__(self, client, directory: str = RECORDINGS_DIR):
+        self.client = client
+        self.directory = directory
+
+    def _append(self, interaction: Dict):
+        path = os.path.join(self.directory, RECORDING_PATTERN.replace("*", clinic_now().strftime("%Y%m%d")))
+        with _cassette_lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path, 'a', encoding='utf-8') as f:
+                if f.tell() == 0:
+                    # Bookings depend on what was already taken, so keep the starting calendar
+                    _write_line(f, {
+                        'cassette': CASSETTE_VERSION,
+                        'recorded_at': clinic_now().isoformat(),
+                        'calendar': _calendar_occupancy(),
+                    })
+                _write_line(f, interaction)
+
+    def invoke_model(self, **kwargs):
+        recorded_at = clinic_now()
+        start = time.perf_counter()
+        response = self.client.invoke_model(**kwargs)
+        raw = response['body'].read()
+        interaction = {
+            'recorded_at': recorded_at.isoformat(),
+            'username': conversation.current_username.get(),
+            'session_id': conversation.current_session_id.get(),
+            'model_ms': round((time.perf_counter() - start) * 1000, 1),
+            'request': json.loads(kwargs['body']),
+            'response': json.loads(raw),
+        }
+        self._append(interaction)
+        # The streaming body was consumed above, so hand back a fresh one
+        return dict(response, body=io.BytesIO(raw))
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+def start_recording(enabled: bool = LLM_RECORDING, directory: str = RECORDINGS_DIR, llm=None) -> bool:
+    """Record the shared LLM's Bedrock calls under directory; does nothing unless enabled"""
+    llm = llm or conversation.llm
+    if not enabled or isinstance(llm.bedrock_client, RecordingClient):
+        return False
+    llm.bedrock_client = RecordingClient(llm.bedrock_client, directory)
+    return True
+
+
+def purge_user_recordings(username: str, directory: str = RECORDINGS_DIR) -> int:
+    """Remove a user's interactions from every cassette; returns how many were removed"""
+    removed = 0
+    with _cassette_lock:
+        for path in sorted(glob.glob(os.path.join(directory, RECORDING_PATTERN))):
+            try:
+                cassette = load_cassette(path)
+                kept = [i for i in cassette['interactions'] if i.get('username') != username]
+                if len(kept) < len(cassette['interactions']):
+                    save_cassette(path, dict(cassette, interactions=kept))
+                    removed += len(cassette['interactions']) - len(kept)
+            except (OSError, ValueError) as e:
+                logger.warning("Could not purge recording %s: %s", path, str(e))
+    return removed
+
+
+def cassette_from_transcript(session_file: str) -> Dict:
+    """Build a cassette from a saved session file.
+
+    Transcripts have no system prompt, timings or token usage, so replays
+    of them only check bookings and local latency.
+    """
+    # Session files are per-field envelopes when encryption at rest is on
+    session = load_json_records(session_file)
+    recorded_at = session.get('session_start') or datetime.now().isoformat()
+    interactions = []
+    history = session.get('conversation_history', [])
+    for i, message in enumerate(history):
+        if message['role'] == 'assistant' and i > 0 and history[i - 1]['role'] == 'user':
+            interactions.append({
+                'recorded_at': recorded_at,
+                'model_ms': None,
+                'request': {'messages': history[:i]},
+                'response': {'content': [{'type': 'text', 'text': message['content']}]},
+            })
+    header = {'cassette': CASSETTE_VERSION, 'recorded_at': recorded_at, 'calendar': {}, 'source': session_file}
+    return {'header': header, 'interactions': interactions}
+
+
+class ReplayClient:
+    """Serves recorded responses in order and keeps the requests it was sent"""
+
+    def __init__(self, interactions: List[Dict]):
+        self.interactions = interactions
+        self.position = 0
+        self.requests = []
+
+    def invoke_model(self, **kwargs):
+        self.requests.append(json.loads(kwargs['body']))
+        if self.position >= len(self.interactions):
+            raise RuntimeError("Cassette has no more recorded responses.")
+        interaction = self.interactions[self.position]
+        self.position += 1
+        return {'body': io.BytesIO(json.dumps(interaction['response']).encode('utf-8'))}
+
+
+@contextmanager
+def _isolated(client: ReplayClient, calendar: Dict, now: List[datetime]):
+    """Point the shared LLM, the clock and the calendar at replay stand-ins.
+
+    Swaps module globals, so do not replay in a process that is serving users.
+    """
+    saved = (conversation.llm.bedrock_client, conversation.clinic_now, calendar_utils.CALENDAR_FILE)
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            conversation.llm.bedrock_client = client
+            conversation.clinic_now = lambda: now[0]
+            calendar_utils.CALENDAR_FILE = os.path.join(tmp, "calendar.json")
+            calendar_utils.save_calendar(calendar)
+            yield
+        finally:
+            conversation.llm.bedrock_client, conversation.clinic_now, calendar_utils.CALENDAR_FILE = saved
+
+
+def _request_size(request: Dict) -> int:
+    return len(json.dumps([request.get('system'), request.get('messages')], ensure_ascii=False))
+
+
+def _replay_once(cassette: Dict, username: str) -> List[Dict]:
+    interactions = cassette['interactions']
+    client = ReplayClient(interactions)
+    now = [None]
+    turns = []
+
+    with _isolated(client, cassette['header'].get('calendar', {}), now):
+        # Sessions interleave in a day's cassette, so each one replays on its own history
+        contexts = {}
+        for i, interaction in enumerate(interactions):
+            recorded = interaction['request']
+            session_id = interaction.get('session_id')
+            if session_id not in contexts or len(recorded['messages']) == 1:
+                # A single message means the recording started a new conversation here
+                contexts[session_id] = {'conversation_history': [], 'appointments': [], 'username': username}
+            context = contexts[session_id]
+            now[0] = datetime.fromisoformat(interaction['recorded_at'])
+            booked_before = len(context.get('appointments', []))
+            sent_before = len(client.requests)
+
+            start = time.perf_counter()
+            _, context = conversation.call_llm(recorded['messages'][-1]['content'], context)
+            contexts[session_id] = context
+            local_ms = (time.perf_counter() - start) * 1000
+
+            sent = client.requests[sent_before] if len(client.requests) > sent_before else {}
+            drift = [field for field in _REQUEST_FIELDS if field in recorded and sent.get(field) != recorded[field]]
+            turn = {
+                'turn': i + 1,
+                'user_input': recorded['messages'][-1]['content'],
+                'bookings': [
+                    {'scheduled_for': a['scheduled_for'], 'status': a['status']}
+                    for a in context.get('appointments', [])[booked_before:]
+                ],
+                'request_drift': drift,
+                'local_ms': local_ms,
+                'model_ms': interaction.get('model_ms'),
+                'input_tokens': None,
+                'output_tokens': None,
+                'tokens_estimated': False,
+            }
+            usage = interaction['response'].get('usage')
+            if usage:
+                turn['output_tokens'] = usage.get('output_tokens')
+                turn['input_tokens'] = usage.get('input_tokens')
+                if drift and sent and turn['input_tokens']:
+                    # The prompt changed; scale the recorded count by the request size
+                    ratio = _request_size(sent) / max(_request_size(recorded), 1)
+                    turn['input_tokens'] = round(turn['input_tokens'] * ratio)
+                    turn['tokens_estimated'] = True
+            turns.append(turn)
+    return turns
+
+
+def replay_cassette(cassette: Dict, username: str = "replay", repeat: int = 1) -> Dict:
+    """Replay a cassette through call_llm without network access.
+
+    Each recorded user turn is sent through call_llm while the Bedrock
+    client serves the recorded responses in order, the clock is frozen at
+    the recording time and bookings go to a scratch copy of the recorded
+    calendar. Local latency is the median over repeat runs; model latency
+    and token counts come from the recording.
+    """
+    runs = [_replay_once(cassette, username) for _ in range(max(repeat, 1))]
+    turns = runs[0]
+    for i, turn in enumerate(turns):
+        turn['local_ms'] = round(statistics.median(run[i]['local_ms'] for run in runs), 2)
+        turn['latency_ms'] = round(turn['local_ms'] + (turn['model_ms'] or 0), 2)
+
+    def total(key):
+        values = [turn[key] for turn in turns if turn[key] is not None]
+        return round(sum(values), 2) if values else None
+
+    return {
+        'turns': turns,
+        'totals': {key: total(key) for key in ('local_ms', 'latency_ms', 'input_tokens', 'output_tokens')},
+    }
+
+
+def compare_reports(baseline: Dict, current: Dict, latency_tolerance: float = LATENCY_TOLERANCE,
+                    token_tolerance: float = TOKEN_TOLERANCE) -> List[str]:
+    """List the regressions of current against baseline; an empty list means no regression"""
+    if len(baseline['turns']) != len(current['turns']):
+        return [f"turn count changed from {len(baseline['turns'])} to {len(current['turns'])}"]
+
+    regressions = []
+    for before, after in zip(baseline['turns'], current['turns']):
+        label = f"turn {after['turn']}"
+        if before['bookings'] != after['bookings']:
+            regressions.append(f"{label}: bookings changed from {before['bookings']} to {after['bookings']}")
+        if after['local_ms'] > before['local_ms'] * (1 + latency_tolerance) + LATENCY_SLACK_MS:
+            regressions.append(f"{label}: local latency rose from {before['local_ms']:.2f} ms "
+                               f"to {after['local_ms']:.2f} ms")
+        for key in ('input_tokens', 'output_tokens'):
+            if before[key] and after[key] and after[key] > before[key] * (1 + token_tolerance):
+                regressions.append(f"{label}: {key} rose from {before[key]} to {after[key]}")
+    return regressions
+
+
+def format_report(report: Dict) -> str:
+    lines = [f"{'turn':>4}  {'local ms':>9}  {'total ms':>9}  {'in tok':>7}  {'out tok':>7}  bookings / drift"]
+    for turn in report['turns']:
+        notes = [f"{b['scheduled_for']} {b['status']}" for b in turn['bookings']]
+        if turn['request_drift']:
+            notes.append("changed: " + ", ".join(turn['request_drift']))
+        input_tokens = f"~{turn['input_tokens']}" if turn['tokens_estimated'] else turn['input_tokens']
+        lines.append(f"{turn['turn']:>4}  {turn['local_ms']:>9.2f}  {turn['latency_ms']:>9.2f}  "
+                     f"{str(input_tokens or '-'):>7}  {str(turn['output_tokens'] or '-'):>7}  {'; '.join(notes)}")
+    return "\n".join(lines)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay recorded LLM sessions offline and check for regressions")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    transcript = commands.add_parser("import-transcript", help="build a cassette from a saved session file")
+    transcript.add_argument("session_file")
+    transcript.add_argument("cassette")
+
+    run = commands.add_parser("run", help="replay a cassette through call_llm")
+    run.add_argument("cassette")
+    run.add_argument("--baseline", help="report to compare against; exits 1 on regression")
+    run.add_argument("--save-baseline", help="write this run's report as the new baseline")
+    run.add_argument("--repeat", type=int, default=5, help="runs to take the median local latency over")
+    run.add_argument("--latency-tolerance", type=float, default=LATENCY_TOLERANCE)
+    run.add_argument("--token-tolerance", type=float, default=TOKEN_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    if args.command == "import-transcript":
+        cassette = cassette_from_transcript(args.session_file)
+        save_cassette(args.cassette, cassette)
+        print(f"Wrote {len(cassette['interactions'])} interactions to {args.cassette}")
+        return 0
+
+    report = replay_cassette(load_cassette(args.cassette), repeat=args.repeat)
+    print(format_report(report))
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare_reports(json.load(f), report, args.latency_tolerance, args.token_tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+# reporting.py
+import argparse
+import csv
+import glob
+import os
+from datetime import date as date_type, datetime, time as time_type
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from chatbot.calendar_utils import load_calendar, save_calendar, ensure_day_exists, generate_daily_slots
+from chatbot.encryption import load_json_records
+from chatbot.memory import SESSION_DIR
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# calendar.json has a single schedule; the column keeps reports ready for more providers
+DEFAULT_PROVIDER = "clinic"
+
+CALENDAR_COLUMNS = ["date", "time", "provider", "username"]
+EVENT_COLUMNS = ["session_id", "username", "request", "scheduled_for", "status", "response"]
+SESSION_FILE_PATTERN = os.path.join(SESSION_DIR, "medical_session_*.json")
+PARQUET_BATCH_SIZE = 10000
+
+
+def _format_of(path: str, fmt: str = None) -> str:
+    fmt = (fmt or os.path.splitext(path)[1].lstrip('.')).lower()
+    if fmt not in ("csv", "parquet"):
+        raise ValueError(f"Unsupported format: {fmt}")
+    if fmt == "parquet" and pq is None:
+        raise ValueError("Parquet export requires the 'pyarrow' package.")
+    return fmt
+
+
+def iter_calendar_rows(calendar: Dict = None) -> Iterator[Dict]:
+    """Yield one row per calendar slot; username is None for open slots"""
+    calendar = load_calendar() if calendar is None else calendar
+    for date in sorted(calendar):
+        for time, username in sorted(calendar[date].items()):
+            yield {"date": date, "time": time, "provider": DEFAULT_PROVIDER, "username": username}
+
+
+def iter_appointment_events(pattern: str = SESSION_FILE_PATTERN) -> Iterator[Dict]:
+    """Yield the appointment records stored in saved session files"""
+    for path in sorted(glob.glob(pattern)):
+        try:
+            context = load_json_records(path)
+        except (OSError, ValueError):
+            continue
+        for appointment in context.get('appointments', []):
+            yield {
+                "session_id": context.get('session_id'),
+                "username": context.get('username'),
+                "request": appointment.get('request'),
+                "scheduled_for": appointment.get('scheduled_for'),
+                "status": appointment.get('status'),
+                "response": appointment.get('response'),
+            }
+
+
+def _write_rows(rows: Iterator[Dict], columns: List[str], path: str, fmt: str = None) -> int:
+    """Stream rows to CSV or Parquet without materializing them all at once"""
+    fmt = _format_of(path, fmt)
+    count = 0
+
+    if fmt == "csv":
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        return count
+
+    schema = pa.schema([(column, pa.string()) for column in columns])
+    with pq.ParquetWriter(path, schema) as writer:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= PARQUET_BATCH_SIZE:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                count += len(batch)
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            count += len(batch)
+    return count
+
+
+def export_calendar(path: str, fmt: str = None, calendar: Dict = None) -> int:
+    """Export every calendar slot to CSV or Parquet and return the row count"""
+    return _write_rows(iter_calendar_rows(calendar), CALENDAR_COLUMNS, path, fmt)
+
+
+def export_appointment_events(path: str, fmt: str = None, pattern: str = SESSION_FILE_PATTERN) -> int:
+    """Export appointment events from saved sessions to CSV or Parquet"""
+    return _write_rows(iter_appointment_events(pattern), EVENT_COLUMNS, path, fmt)
+
+
+def _read_rows(path: str, fmt: str = None) -> Iterator[Dict]:
+    fmt = _format_of(path, fmt)
+    if fmt == "csv":
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            yield from csv.DictReader(f)
+        return
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=PARQUET_BATCH_SIZE):
+        yield from batch.to_pylist()
+
+
+def _canonical_slot(date, time) -> Tuple:
+    """Typed Parquet columns come back as date/datetime/time objects; use the calendar's strings"""
+    if isinstance(date, datetime):
+        date = date.date()
+    if isinstance(date, date_type):
+        date = date.isoformat()
+    if isinstance(time, (datetime, time_type)):
+        time = time.strftime("%H:%M")
+    return date, time
+
+
+def _row_problem(date, time, slots: Dict) -> str:
+    """Why a row cannot be imported, or None when it is a valid slot"""
+    try:
+        if datetime.strptime(str(date), "%Y-%m-%d").strftime("%Y-%m-%d") != date:
+            raise ValueError
+    except ValueError:
+        return f"invalid date {date!r}"
+    if time not in slots:
+        return f"{time!r} is not a clinic slot"
+    return None
+
+
+def import_calendar(path: str, fmt: str = None, overwrite: bool = False) -> Tuple[int, List[str], List[str]]:
+    """Merge slots from CSV or Parquet into the calendar.
+
+    Rows without a username seed open days. Slots already held by another
+    user are kept and reported as conflicts unless overwrite is set. Rows
+    with a malformed date or a time that is not a clinic slot are skipped
+    and reported as rejected.
+    """
+    calendar = load_calendar()
+    slots = generate_daily_slots()
+    imported = 0
+    conflicts = []
+    rejected = []
+
+    for row_number, row in enumerate(_read_rows(path, fmt), start=1):
+        missing = [column for column in ("date", "time") if column not in row]
+        if missing:
+            raise ValueError(f"{path} has no {' or '.join(missing)} column.")
+        date, time = _canonical_slot(row["date"], row["time"])
+        username = row.get("username") or None
+        problem = _row_problem(date, time, slots)
+        if problem:
+            rejected.append(f"row {row_number}: {problem}")
+            continue
+        calendar = ensure_day_exists(calendar, date)
+        current = calendar[date].get(time)
+        if username is None:
+            calendar[date].setdefault(time, None)
+            continue
+        if current not in (None, username) and not overwrite:
+            conflicts.append(f"{date} at {time}")
+            continue
+        calendar[date][time] = username
+        imported += 1
+
+    save_calendar(calendar)
+    return imported, conflicts, rejected
+
+
+def calendar_to_frame(calendar: Dict = None) -> pd.DataFrame:
+    """Flatten the calendar into one row per slot"""
+    calendar = load_calendar() if calendar is None else calendar
+    dates, times, users = [], [], []
+    for date, slots in calendar.items():
+        dates.extend([date] * len(slots))
+        times.extend(slots.keys())
+        users.extend(slots.values())
+
+    frame = pd.DataFrame({
+        "date": pd.to_datetime(pd.Series(dates, dtype="object")),
+        "time": pd.Series(times, dtype="object"),
+        "provider": DEFAULT_PROVIDER,
+        "username": pd.Series(users, dtype="object"),
+    })
+    frame["booked"] = frame["username"].notna().to_numpy(dtype=np.int64)
+    return frame
+
+
+def utilization_report(calendar: Dict = None) -> Dict[str, pd.DataFrame]:
+    """Compute fill rate per day/provider, peak hours and no-show candidates.
+
+    No-show candidates are users holding more than one slot on the same
+    day, the usual sign of a duplicate or speculative booking.
+    """
+    frame = calendar_to_frame(calendar)
+
+    daily = (frame.groupby(["date", "provider"], sort=True)["booked"]
+             .agg(slots="size", booked="sum")
+             .reset_index())
+    daily["fill_rate"] = daily["booked"] / daily["slots"]
+
+    peak_hours = (frame.groupby("time", sort=True)["booked"]
+                  .agg(slots="size", booked="sum")
+                  .reset_index())
+    peak_hours["fill_rate"] = peak_hours["booked"] / peak_hours["slots"]
+    peak_hours = peak_hours.sort_values(["booked", "time"], ascending=[False, True], ignore_index=True)
+
+    held = frame[frame["booked"] == 1]
+    per_user_day = held.groupby(["username", "date"]).size().rename("bookings").reset_index()
+    no_show_candidates = per_user_day[per_user_day["bookings"] > 1].reset_index(drop=True)
+
+    return {"daily": daily, "peak_hours": peak_hours, "no_show_candidates": no_show_candidates}
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Calendar export, import and utilization reports")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("export", help="Export calendar slots").add_argument("path")
+    subparsers.add_parser("export-events", help="Export appointment events").add_argument("path")
+    import_parser = subparsers.add_parser("import", help="Import calendar slots")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--overwrite", action="store_true")
+    subparsers.add_parser("report", help="Print utilization report")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        print(f"Exported {export_calendar(args.path)} slots to {args.path}")
+    elif args.command == "export-events":
+        print(f"Exported {export_appointment_events(args.path)} events to {args.path}")
+    elif args.command == "import":
+        imported, conflicts, rejected = import_calendar(args.path, overwrite=args.overwrite)
+        print(f"Imported {imported} bookings, {len(conflicts)} conflicts, {len(rejected)} rejected rows")
+        for conflict in conflicts:
+            print(f"  conflict: {conflict}")
+        for rejection in rejected:
+            print(f"  rejected: {rejection}")
+    else:
+        for name, table in utilization_report().items():
+            print(f"\n## {name}\n{table.to_string(index=False)}")
+
+
+if __name__ == "__main__":
+    main()
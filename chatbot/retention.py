@@ -0,0 +1,226 @@
+# retention.py
+import glob
+import gzip
+import logging
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from chatbot.calendar_utils import cancel_user_appointments
+from chatbot.encryption import load_json_records
+from chatbot.memory import SESSION_DIR, SessionStore, get_session_store
+from chatbot.replay import RECORDING_PATTERN, RECORDINGS_DIR, purge_user_recordings
+
+LOG_DIR = "./logs"
+ARCHIVE_DIR = os.path.join(LOG_DIR, "archive")
+AUDIT_LOG_FILE = os.path.join(LOG_DIR, "audit.log")
+
+# Per-artifact retention policies; override entries before starting the sweeper
+RETENTION_POLICIES = {
+    'session_files': {
+        'patterns': [os.path.join(SESSION_DIR, "*.json")],
+        'max_age': timedelta(days=1),
+        'max_total_bytes': 50 * 1024 * 1024,
+    },
+    'llm_recordings': {
+        'patterns': [os.path.join(RECORDINGS_DIR, RECORDING_PATTERN)],
+        'max_age': timedelta(days=7),
+        'max_total_bytes': 200 * 1024 * 1024,
+    },
+    'orchestration_log': {
+        'path': os.path.join(LOG_DIR, "orchestration.log"),
+        'max_bytes': 5 * 1024 * 1024,
+        'archive_max_age': timedelta(days=30),
+    },
+    'performance_log': {
+        'path': os.path.join(LOG_DIR, "performance.log"),
+        'max_bytes': 5 * 1024 * 1024,
+        'archive_max_age': timedelta(days=30),
+    },
+    'audit_log': {
+        'path': AUDIT_LOG_FILE,
+        'max_bytes': 5 * 1024 * 1024,
+        'archive_max_age': timedelta(days=365),
+    },
+}
+
+SWEEP_INTERVAL = timedelta(minutes=15)
+
+logger = logging.getLogger(__name__)
+
+
+def _session_files(patterns: List[str]) -> List[str]:
+    files = set()
+    for pattern in patterns:
+        files.update(glob.glob(pattern))
+    return sorted(files)
+
+
+def sweep_session_files(policy: Dict, now: datetime = None) -> List[str]:
+    """Delete session files older than max_age, then oldest first until under max_total_bytes"""
+    now = now or datetime.now()
+    cutoff = (now - policy['max_age']).timestamp()
+    removed = []
+    kept = []
+
+    for path in _session_files(policy['patterns']):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        if stat.st_mtime < cutoff:
+            removed.append(path)
+        else:
+            kept.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in kept)
+    for _, size, path in sorted(kept):
+        if total <= policy['max_total_bytes']:
+            break
+        removed.append(path)
+        total -= size
+
+    for path in removed:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def rotate_log(policy: Dict, now: datetime = None, archive_dir: str = ARCHIVE_DIR) -> str:
+    """Gzip the log into archive_dir and truncate it once it exceeds max_bytes"""
+    path = policy['path']
+    if not os.path.exists(path) or os.path.getsize(path) <= policy['max_bytes']:
+        return None
+
+    now = now or datetime.now()
+    os.makedirs(archive_dir, exist_ok=True)
+    archive_path = os.path.join(archive_dir, f"{os.path.basename(path)}.{now.strftime('%Y%m%d_%H%M%S')}.gz")
+
+    # Copy then truncate in place: logging handlers and app.py keep the file open in append mode
+    with open(path, 'rb') as src, gzip.open(archive_path, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    with open(path, 'r+b') as f:
+        f.truncate(0)
+    return archive_path
+
+
+def purge_archives(policy: Dict, now: datetime = None, archive_dir: str = ARCHIVE_DIR) -> List[str]:
+    """Delete archived copies of the log older than archive_max_age"""
+    now = now or datetime.now()
+    cutoff = (now - policy['archive_max_age']).timestamp()
+    pattern = os.path.join(archive_dir, f"{os.path.basename(policy['path'])}.*.gz")
+    removed = []
+    for path in glob.glob(pattern):
+        if os.path.getmtime(path) < cutoff:
+            os.remove(path)
+            removed.append(path)
+    return removed
+
+
+def run_retention_sweep(policies: Dict = None, now: datetime = None, store: SessionStore = None) -> Dict:
+    """Apply every retention policy once and return a summary of what was removed"""
+    policies = policies or RETENTION_POLICIES
+    store = store if store is not None else get_session_store()
+    summary = {}
+
+    for name, policy in policies.items():
+        try:
+            if 'patterns' in policy:
+                summary[name] = {'deleted': len(sweep_session_files(policy, now))}
+            else:
+                archived = rotate_log(policy, now)
+                summary[name] = {
+                    'archived': 1 if archived else 0,
+                    'archives_deleted': len(purge_archives(policy, now)),
+                }
+        except Exception as e:
+            logger.error("Retention sweep failed for %s: %s", name, str(e))
+
+    if store is not None:
+        # A locked SQLite database must not kill the sweeper thread
+        try:
+            summary['session_store'] = {'deleted': store.purge_expired()}
+        except Exception as e:
+            logger.error("Retention sweep failed for session_store: %s", str(e))
+
+    logger.info("Retention sweep finished: %s", summary)
+    return summary
+
+
+class RetentionSweeper:
+    """Daemon thread that runs the retention sweep on a fixed interval"""
+
+    def __init__(self, interval: timedelta = SWEEP_INTERVAL, policies: Dict = None):
+        self.interval = interval
+        self.policies = policies
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="retention-sweeper", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            run_retention_sweep(self.policies)
+            self._stop.wait(self.interval.total_seconds())
+
+
+_sweeper = None
+_sweeper_lock = threading.Lock()
+
+
+def start_retention_sweeper() -> RetentionSweeper:
+    """Start the process-wide sweeper once; later calls return the running instance"""
+    global _sweeper
+    with _sweeper_lock:
+        if _sweeper is None:
+            _sweeper = RetentionSweeper().start()
+        return _sweeper
+
+
+def _session_file_owner(path: str) -> str:
+    return load_json_records(path).get('username')
+
+
+def delete_user_data(username: str, session_ids: List[str] = None, store: SessionStore = None) -> Dict:
+    """Purge a user's saved and stored sessions, calendar entries and recorded LLM calls"""
+    store = store if store is not None else get_session_store()
+    deleted_files = []
+
+    for path in _session_files(RETENTION_POLICIES['session_files']['patterns']):
+        try:
+            # Only the stored username decides ownership; file names are not tied to users
+            if _session_file_owner(path) == username:
+                os.remove(path)
+                deleted_files.append(path)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not inspect session file %s: %s", path, str(e))
+
+    stored_sessions = 0
+    if store is not None:
+        for session_id in session_ids or []:
+            store.delete(session_id)
+        # Other browsers and replicas may hold sessions of the same user
+        stored_sessions = store.delete_user_sessions(username)
+
+    cancelled = cancel_user_appointments(username)
+    recordings = purge_user_recordings(username)
+
+    os.makedirs(LOG_DIR, exist_ok=True)
+    with open(AUDIT_LOG_FILE, "a") as log:
+        log.write(f"{datetime.now()} - DELETE_DATA - {username} - "
+                  f"{len(deleted_files)} session files, {stored_sessions} stored sessions, "
+                  f"{len(cancelled)} appointments, "
+                  f"{recordings} recorded LLM calls\n")
+
+    return {'session_files': deleted_files, 'stored_sessions': stored_sessions, 'appointments': cancelled,
+            'recordings': recordings}
@@ -0,0 +1,32 @@
+import pytest
+from cryptography.fernet import Fernet
+
+from chatbot import calendar_utils
+from chatbot.encryption import RecordCipher, set_record_cipher
+
+
+@pytest.fixture
+def calendar_file(tmp_path, monkeypatch):
+    """Point the calendar at a file under tmp_path"""
+    path = tmp_path / "calendar.json"
+    monkeypatch.setattr(calendar_utils, 'CALENDAR_FILE', str(path))
+    return path
+
+
+@pytest.fixture
+def file_sessions(tmp_path, monkeypatch):
+    """Use the default file backend, writing session files under tmp_path"""
+    session_dir = tmp_path / "sessions"
+    monkeypatch.setattr('chatbot.memory._session_store', None)
+    monkeypatch.setattr('chatbot.memory.SESSION_STORE_BACKEND', 'file')
+    monkeypatch.setattr('chatbot.memory.SESSION_DIR', str(session_dir))
+    return session_dir
+
+
+@pytest.fixture
+def cipher():
+    """Encrypt records at rest with a throwaway key"""
+    cipher = RecordCipher(Fernet.generate_key())
+    set_record_cipher(cipher)
+    yield cipher
+    set_record_cipher(None)
@@ -0,0 +1,181 @@
+import json
+import threading
+import time
+import pytest
+from datetime import datetime
+
+from chatbot import calendar_utils, conversation
+from chatbot.batch import run_batch
+
+
+pytestmark = pytest.mark.usefixtures("calendar_file")
+
+
+def write_requests(path, requests):
+    path.write_text("".join(json.dumps(request) + "\n" for request in requests))
+    return str(path)
+
+
+def read_results(path):
+    return [json.loads(line) for line in open(path)]
+
+
+class FakeBedrock:
+    """Local stand-in for the Bedrock call: confirms the slot named in the request"""
+
+    def __init__(self, delays=None, default_delay=0.0):
+        self.delays = delays or {}
+        self.default_delay = default_delay
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, messages, system_prompt=None):
+        message = messages[-1]['content']
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delays.get(message, self.default_delay))
+        with self._lock:
+            self.active -= 1
+        slot = message.rsplit(" ", 1)[-1]
+        if "health" in message:
+            return "Drink water and sleep well."
+        return f"Your appointment is confirmed for 2025-08-25 at {slot}."
+
+
+def test_conflicts_resolve_in_arrival_order(tmp_path):
+    # The first request is slowest, but it arrived first and keeps the slot
+    requests = [
+        {"request_id": "r1", "username": "alice", "message": "book appointment 10:00"},
+        {"request_id": "r2", "username": "bob", "message": "book appointment 10:00"},
+        {"request_id": "r3", "username": "carol", "message": "book appointment 11:00"},
+    ]
+    fake = FakeBedrock()
+    input_path = write_requests(tmp_path / "in.jsonl", requests)
+    first_call = threading.Event()
+
+    def generate(messages, system_prompt=None):
+        if not first_call.is_set():
+            first_call.set()
+            time.sleep(0.1)
+        return fake(messages, system_prompt)
+
+    summary = run_batch(input_path, str(tmp_path / "out.jsonl"), workers=3, generate=generate)
+    results = read_results(tmp_path / "out.jsonl")
+
+    assert [r['request_id'] for r in results] == ["r1", "r2", "r3"]
+    assert [r['status'] for r in results] == ["booked", "conflict", "booked"]
+    assert results[1]['suggested'] == "2025-08-25 10:30"
+    assert calendar_utils.load_calendar()["2025-08-25"]["10:00"] == "alice"
+    assert summary == {"booked": 2, "conflict": 1}
+
+
+def test_non_scheduling_requests_are_answered(tmp_path):
+    input_path = write_requests(tmp_path / "in.jsonl", [{"message": "general health tips"}])
+
+    run_batch(input_path, str(tmp_path / "out.jsonl"), workers=1, generate=FakeBedrock())
+    result = read_results(tmp_path / "out.jsonl")[0]
+
+    assert result['request_id'] == "line-1"
+    assert result['status'] == "answered"
+    assert calendar_utils.load_calendar() == {}
+
+
+def test_generate_errors_are_reported(tmp_path):
+    input_path = write_requests(tmp_path / "in.jsonl", [{"message": "book appointment 10:00"}])
+
+    def failing(messages, system_prompt=None):
+        raise RuntimeError("throttled")
+
+    run_batch(input_path, str(tmp_path / "out.jsonl"), workers=1, generate=failing)
+    result = read_results(tmp_path / "out.jsonl")[0]
+
+    assert result['status'] == "error"
+    assert result['response'] == "throttled"
+
+
+def test_falls_back_to_local_resolution(tmp_path):
+    input_path = write_requests(tmp_path / "in.jsonl", [{"message": "please book 2025-08-26 at 2pm"}])
+
+    run_batch(input_path, str(tmp_path / "out.jsonl"), workers=1,
+              generate=lambda messages, system_prompt=None: "Sure, I can help with that.")
+    result = read_results(tmp_path / "out.jsonl")[0]
+
+    assert result['status'] == "booked"
+    assert result['scheduled_for'] == "2025-08-26 14:00"
+
+
+@pytest.mark.parametrize("message, candidates", [
+    # On a Monday, "next tuesday" may be tomorrow or the week after
+    ("book next tuesday at 3pm", ["2026-10-20 15:00", "2026-10-27 15:00"]),
+    # 1:15pm is not a slot, so 13:30 needs confirming
+    ("book friday at 1:15pm", ["2026-10-23 13:30"]),
+])
+def test_fallback_does_not_book_unconfirmed_slots(tmp_path, monkeypatch, message, candidates):
+    monkeypatch.setattr('chatbot.batch.clinic_now', lambda: datetime(2026, 10, 19, 9, 0))
+    input_path = write_requests(tmp_path / "in.jsonl", [{"message": message}])
+
+    run_batch(input_path, str(tmp_path / "out.jsonl"), workers=1,
+              generate=lambda messages, system_prompt=None: "Which Tuesday did you mean?")
+    result = read_results(tmp_path / "out.jsonl")[0]
+
+    assert result['status'] == "no_slot"
+    assert result['candidates'] == candidates
+    assert calendar_utils.load_calendar() == {}
+
+
+def test_concurrency_is_bounded(tmp_path):
+    requests = [{"message": f"book appointment {10 + i // 2}:{'30' if i % 2 else '00'}"} for i in range(12)]
+    fake = FakeBedrock(default_delay=0.02)
+
+    run_batch(write_requests(tmp_path / "in.jsonl", requests), str(tmp_path / "out.jsonl"),
+              workers=3, generate=fake)
+
+    assert fake.max_active <= 3
+
+
+def test_bad_lines_are_reported_and_the_batch_continues(tmp_path):
+    input_path = tmp_path / "in.jsonl"
+    input_path.write_text('{"request_id": "r1", "message": "book appointment 10:00"}\n'
+                          '{"request_id": "r2", "message": \n'
+                          '{"request_id": "r3"}\n'
+                          '["not", "an", "object"]\n'
+                          '{"request_id": "r5", "message": "book appointment 10:30"}\n')
+
+    summary = run_batch(str(input_path), str(tmp_path / "out.jsonl"), workers=2, generate=FakeBedrock())
+    results = read_results(tmp_path / "out.jsonl")
+
+    assert [r['request_id'] for r in results] == ["r1", "line-2", "r3", "line-4", "r5"]
+    assert [r['status'] for r in results] == ["booked", "error", "error", "error", "booked"]
+    assert "no 'message'" in results[2]['response']
+    assert summary == {"booked": 2, "error": 3}
+
+
+@pytest.mark.parametrize("username", [None, "", 42])
+def test_invalid_usernames_are_reported(tmp_path, username):
+    input_path = write_requests(tmp_path / "in.jsonl", [
+        {"username": username, "message": "book appointment 10:00"},
+    ])
+
+    summary = run_batch(input_path, str(tmp_path / "out.jsonl"), workers=1, generate=FakeBedrock())
+    result = read_results(tmp_path / "out.jsonl")[0]
+
+    assert summary == {"error": 1}
+    assert "invalid 'username'" in result['response']
+    assert calendar_utils.load_calendar() == {}
+
+
+def test_bedrock_failures_are_errors_not_fallback_bookings(tmp_path, monkeypatch):
+    class ThrottledClient:
+        def invoke_model(self, **kwargs):
+            raise RuntimeError("ThrottlingException")
+    monkeypatch.setattr(conversation.llm, 'bedrock_client', ThrottledClient())
+    input_path = write_requests(tmp_path / "in.jsonl", [{"message": "please book 2025-08-26 at 2pm"}])
+
+    run_batch(input_path, str(tmp_path / "out.jsonl"), workers=1)
+    result = read_results(tmp_path / "out.jsonl")[0]
+
+    assert result['status'] == "error"
+    assert result['response'] == "ThrottlingException"
+    assert calendar_utils.load_calendar() == {}
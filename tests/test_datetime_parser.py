@@ -0,0 +1,135 @@
+import pytest
+from datetime import datetime
+
+from chatbot import calendar_utils, conversation
+from chatbot.conversation import extract_datetime
+from chatbot.datetime_parser import resolve_datetime, describe_resolution
+
+# Monday, the day the saved session in the repo was recorded
+NOW = datetime(2025, 6, 23, 13, 53)
+
+
+@pytest.mark.parametrize("text, expected_date, expected_time", [
+    ("Hi i need to schedule an appointment at 3pm next tuesday", "2025-06-24", "15:00"),
+    ("Hi i need to schedule an appointment at 3pm august 23rd 2025", "2025-08-23", "15:00"),
+    ("2025-08-23 at 15:00", "2025-08-23", "15:00"),
+    ("23 Aug at 10:30 a.m.", "2025-08-23", "10:30"),
+    ("noon on 7/4", "2025-07-04", "12:00"),
+    ("tomorrow at 11", "2025-06-24", "11:00"),
+    ("day after tomorrow at 2:10pm", "2025-06-25", "14:00"),
+    ("in two weeks at 3", "2025-07-07", "15:00"),
+    ("jan 5 at 1pm", "2026-01-05", "13:00"),
+    ("monday at 10am", "2025-06-30", "10:00"),
+    ("this monday at 10am", "2025-06-23", "10:00"),
+])
+def test_resolves_exact_slots(text, expected_date, expected_time):
+    result = resolve_datetime(text, now=NOW)
+
+    assert result['date'] == expected_date
+    assert result['time'] == expected_time
+    assert result['slots'] == [expected_time]
+    assert result['in_clinic_hours'] is True
+
+
+def test_resolves_part_of_day_window():
+    result = resolve_datetime("tomorrow afternoon", now=NOW)
+
+    assert result['date'] == "2025-06-24"
+    assert result['time'] is None
+    assert result['window'] == ("12:00", "16:00")
+    assert result['slots'][0] == "12:00"
+    assert result['slots'][-1] == "15:30"
+
+
+def test_resolves_explicit_range_sharing_meridiem():
+    result = resolve_datetime("between 2 and 4pm on friday", now=NOW)
+
+    assert result['date'] == "2025-06-27"
+    assert result['window'] == ("14:00", "16:00")
+    assert result['slots'] == ["14:00", "14:30", "15:00", "15:30"]
+
+
+def test_flags_times_outside_clinic_hours():
+    result = resolve_datetime("friday at 9am", now=NOW)
+
+    assert result['time'] == "09:00"
+    assert result['slots'] == []
+    assert result['in_clinic_hours'] is False
+    assert "outside clinic hours" in describe_resolution(result)
+
+
+def test_next_weekday_early_in_the_week_is_ambiguous():
+    result = resolve_datetime("3pm next tuesday", now=NOW)
+
+    assert result['date'] == "2025-06-24"
+    assert result['alternative_date'] == "2025-07-01"
+    assert "ambiguous" in describe_resolution(result)
+
+
+def test_next_weekday_already_past_is_not_ambiguous():
+    assert resolve_datetime("next monday at 10am", now=NOW)['alternative_date'] is None
+    assert resolve_datetime("tuesday at 3pm", now=NOW)['alternative_date'] is None
+
+
+def test_book_slot_rejects_off_grid_times(calendar_file):
+    success, _ = calendar_utils.book_slot("alice", "2025-08-23", "16:00")
+
+    assert success is False
+    assert calendar_utils.load_calendar() == {}
+
+
+def test_relative_dates_can_be_disabled():
+    assert resolve_datetime("next tuesday at 3pm", now=NOW, allow_relative=False)['date'] is None
+
+
+def test_no_date_or_time():
+    result = resolve_datetime("What are the symptoms of flu?", now=NOW)
+
+    assert result == {'date': None, 'time': None, 'window': None, 'slots': [], 'in_clinic_hours': None, 'snapped': False,
+                      'alternative_date': None}
+    assert describe_resolution(result) is None
+
+
+def test_month_name_inside_word_is_ignored():
+    assert resolve_datetime("I decided 5 minutes ago", now=NOW)['date'] is None
+
+
+def test_out_of_range_offset():
+    assert resolve_datetime("book appointment in 9999999 days", now=NOW)['date'] is None
+    assert resolve_datetime("in 99999999999999999999 weeks", now=NOW)['date'] is None
+
+
+def test_prompt_errors_do_not_escape_call_llm(monkeypatch):
+    def bad_timezone():
+        raise KeyError("No time zone found with key Mars/Olympus")
+    monkeypatch.setattr(conversation, 'clinic_now', bad_timezone)
+
+    response, context = conversation.call_llm("book an appointment tomorrow", {'conversation_history': []})
+
+    assert response.startswith("I apologize")
+    assert context == {'conversation_history': []}
+
+
+def test_invalid_calendar_date():
+    assert resolve_datetime("2025-02-30 at 10:00", now=NOW)['date'] is None
+
+
+class TestExtractDatetime:
+    """extract_datetime only books on canonical confirmations"""
+
+    def test_canonical_confirmation(self):
+        assert extract_datetime("Great, I've scheduled your appointment for:\n\n2025-08-23 at 15:00") == \
+            ("2025-08-23", "15:00")
+
+    @pytest.mark.parametrize("reply", [
+        "Booked for 2025-08-23 at 15:15",
+        "Booked for 2025-08-23 at 15:45",
+        "Booked for 2025-08-23 at 16:00",
+        "Booked for 2025-08-23 at 09:30",
+    ])
+    def test_rejects_times_off_the_slot_grid(self, reply):
+        assert extract_datetime(reply) == (None, None)
+
+    def test_ignores_unconfirmed_relative_proposal(self):
+        reply = "The next available 30-minute appointment slot on Tuesday is at 3:00 PM. Does that work for you?"
+        assert extract_datetime(reply) == (None, None)
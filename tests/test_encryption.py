@@ -0,0 +1,121 @@
+import json
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from cryptography.fernet import Fernet
+
+from chatbot import calendar_utils
+from chatbot.encryption import (
+    RecordCipher, set_record_cipher, is_envelope, encode_records, decode_records,
+    load_json_records, save_json_records
+)
+from chatbot.memory import SQLiteSessionStore, init_context, save_context_to_file
+
+
+def test_seal_and_open_round_trip(cipher):
+    envelope = cipher.seal("hello")
+
+    assert is_envelope(envelope)
+    assert "hello" not in json.dumps(envelope)
+    assert cipher.open(envelope) == "hello"
+
+
+def test_open_decrypts_without_cache():
+    key = Fernet.generate_key()
+    envelope = RecordCipher(key).seal("hello")
+    fresh = RecordCipher(key)
+
+    assert fresh.open(envelope) == "hello"
+    assert fresh.misses == 1
+    assert fresh.open(envelope) == "hello"
+    assert fresh.hits == 1
+
+
+def test_open_with_wrong_key_raises_value_error():
+    envelope = RecordCipher(Fernet.generate_key()).seal("hello")
+
+    with pytest.raises(ValueError):
+        RecordCipher(Fernet.generate_key()).open(envelope)
+
+
+def test_decrypt_cache_is_bounded():
+    cipher = RecordCipher(Fernet.generate_key(), cache_size=2)
+    envelopes = [cipher.seal(str(i)) for i in range(3)]
+
+    assert cipher.peek(envelopes[0]) is None
+    assert cipher.peek(envelopes[2]) == "2"
+
+
+def test_encode_records_reuses_unchanged_envelopes(cipher):
+    stored = encode_records({"a": {"10:00": None}, "b": {"10:00": None}}, cipher)
+
+    updated = encode_records({"a": {"10:00": "alice"}, "b": {"10:00": None}}, cipher, stored)
+
+    assert updated["a"]["ct"] != stored["a"]["ct"]
+    assert updated["b"] is stored["b"]
+    assert decode_records(updated, cipher) == {"a": {"10:00": "alice"}, "b": {"10:00": None}}
+
+
+def test_envelope_cache_is_safe_across_threads(cipher, tmp_path, monkeypatch):
+    # A tiny bound makes every save evict another thread's entry
+    monkeypatch.setattr('chatbot.encryption._ENVELOPE_FILES', 2)
+
+    def save_and_load(worker):
+        path = str(tmp_path / f"session_{worker}.json")
+        for i in range(50):
+            save_json_records(path, {'n': i})
+            assert load_json_records(path) == {'n': i}
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(save_and_load, range(8)))
+
+
+def test_booking_encrypts_calendar_per_day(cipher, calendar_file):
+    calendar_utils.book_slot("alice", "2025-08-23", "10:00")
+    calendar_utils.book_slot("bob", "2025-08-24", "10:00")
+    before = json.loads(calendar_file.read_text())
+
+    calendar_utils.book_slot("carol", "2025-08-24", "10:30")
+    after = json.loads(calendar_file.read_text())
+
+    assert "alice" not in calendar_file.read_text()
+    assert after["2025-08-23"] == before["2025-08-23"]
+    assert after["2025-08-24"] != before["2025-08-24"]
+    assert calendar_utils.list_user_appointments("carol") == ["2025-08-24 at 10:30"]
+
+
+def test_plaintext_calendar_is_still_readable(cipher, calendar_file):
+    calendar_file.write_text(json.dumps({"2025-08-23": {"10:00": "admin"}}))
+
+    assert calendar_utils.list_user_appointments("admin") == ["2025-08-23 at 10:00"]
+
+
+def test_encrypted_file_without_key_raises(tmp_path, monkeypatch):
+    monkeypatch.setattr('chatbot.encryption.ENCRYPTION_AT_REST', 'off')
+    path = str(tmp_path / "records.json")
+    set_record_cipher(RecordCipher(Fernet.generate_key()))
+    save_json_records(path, {"a": 1})
+    set_record_cipher(None)
+
+    with pytest.raises(ValueError):
+        load_json_records(path)
+
+
+def test_session_file_is_encrypted(cipher, file_sessions):
+    context = init_context()
+    context['conversation_history'].append({'role': 'user', 'content': 'my symptoms'})
+    filename = str(file_sessions / "medical_session_1.json")
+
+    save_context_to_file(context, filename="medical_session_1.json")
+
+    assert "my symptoms" not in open(filename).read()
+    assert load_json_records(filename)['conversation_history'] == context['conversation_history']
+
+
+def test_sqlite_store_encrypts_contexts(cipher):
+    store = SQLiteSessionStore(":memory:")
+    context = init_context()
+    context['conversation_history'].append({'role': 'user', 'content': 'my symptoms'})
+    store.put(context['session_id'], context)
+
+    assert "my symptoms" not in store._get(context['session_id'])
+    assert store.get(context['session_id'])['conversation_history'] == context['conversation_history']
@@ -0,0 +1,193 @@
+import fnmatch
+import pytest
+from datetime import datetime, timedelta
+
+from chatbot.memory import (
+    InMemorySessionStore, SQLiteSessionStore, RedisSessionStore, SessionStore,
+    SESSION_ID_PATTERN, init_context, save_context_to_file, build_session_store
+)
+
+
+class FakeClock:
+    """Manually advanced clock for TTL tests"""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class FakeRedis:
+    """Minimal Redis-compatible stand-in honouring get/set(ex=)/delete/scan_iter"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.data = {}
+
+    def get(self, key):
+        entry = self.data.get(key)
+        if entry is None or entry[1] <= self.clock():
+            self.data.pop(key, None)
+            return None
+        return entry[0].encode('utf-8')
+
+    def set(self, key, value, ex=None):
+        self.data[key] = (value, self.clock() + ex if ex else float('inf'))
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def scan_iter(self, match):
+        return [key.encode('utf-8') for key in list(self.data) if fnmatch.fnmatch(key, match)]
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def store(request, clock):
+    if request.param == "memory":
+        return InMemorySessionStore(clock=clock)
+    if request.param == "sqlite":
+        return SQLiteSessionStore(":memory:", clock=clock)
+    return RedisSessionStore(FakeRedis(clock))
+
+
+class TestSessionStore:
+    """Behaviour shared by every session store backend"""
+
+    def test_round_trip_restores_datetime(self, store):
+        context = init_context()
+        context['conversation_history'].append({'role': 'user', 'content': 'Hello'})
+        store.put(context['session_id'], context)
+
+        loaded = store.get(context['session_id'])
+
+        assert loaded['conversation_history'] == context['conversation_history']
+        assert isinstance(loaded['session_start'], datetime)
+        assert loaded['session_start'] == context['session_start']
+
+    def test_missing_session_returns_none(self, store):
+        assert store.get("does-not-exist") is None
+
+    def test_expires_after_session_timeout(self, store, clock):
+        store.put("sid", init_context())
+        clock.advance(timedelta(minutes=29).total_seconds())
+        assert store.get("sid") is not None
+        clock.advance(timedelta(minutes=1).total_seconds())
+        assert store.get("sid") is None
+
+    def test_put_refreshes_expiry(self, store, clock):
+        context = init_context()
+        store.put("sid", context)
+        clock.advance(20 * 60)
+        store.put("sid", context)
+        clock.advance(20 * 60)
+        assert store.get("sid") is not None
+
+    def test_delete(self, store):
+        store.put("sid", init_context())
+        store.delete("sid")
+        assert store.get("sid") is None
+
+    def test_delete_user_sessions(self, store):
+        store.put("a1", dict(init_context(), username="alice"))
+        store.put("a2", dict(init_context(), username="alice"))
+        store.put("b1", dict(init_context(), username="bob"))
+
+        assert store.delete_user_sessions("alice") == 2
+        assert store.get("a1") is None and store.get("a2") is None
+        assert store.get("b1") is not None
+
+
+def test_in_memory_store_evicts_least_recently_used(clock):
+    store = InMemorySessionStore(max_entries=2, clock=clock)
+    store.put("a", init_context())
+    store.put("b", init_context())
+    store.get("a")
+    store.put("c", init_context())
+
+    assert store.get("a") is not None
+    assert store.get("b") is None
+    assert store.get("c") is not None
+
+
+def test_sqlite_purge_expired(clock):
+    store = SQLiteSessionStore(":memory:", clock=clock)
+    store.put("old", init_context())
+    clock.advance(31 * 60)
+    store.put("new", init_context())
+
+    assert store.purge_expired() == 1
+    assert store.get("new") is not None
+
+
+def test_sqlite_store_shared_between_connections(tmp_path):
+    db_file = str(tmp_path / "sessions.db")
+    context = init_context()
+    SQLiteSessionStore(db_file).put(context['session_id'], context)
+
+    assert SQLiteSessionStore(db_file).get(context['session_id']) is not None
+
+
+def test_init_context_resumes_from_store(clock):
+    store = InMemorySessionStore(clock=clock)
+    context = init_context()
+    context['username'] = 'alice'
+    context['appointments'].append({'scheduled_for': '2025-08-23 15:00'})
+    save_context_to_file(context, store=store)
+
+    resumed = init_context(session_id=context['session_id'], store=store, username='alice')
+
+    assert resumed['appointments'] == context['appointments']
+
+
+def test_init_context_does_not_resume_another_users_session(clock):
+    store = InMemorySessionStore(clock=clock)
+    context = init_context()
+    context['username'] = 'alice'
+    store.put(context['session_id'], context)
+
+    hijacked = init_context(session_id=context['session_id'], store=store, username='mallory')
+
+    assert hijacked['session_id'] != context['session_id']
+    assert hijacked['conversation_history'] == []
+
+
+@pytest.mark.parametrize("session_id", ["sid", "../../etc/evil", "session_20250623_135338_0123456g"])
+def test_init_context_never_reuses_client_session_ids(clock, session_id):
+    for store in (None, InMemorySessionStore(clock=clock)):
+        context = init_context(session_id=session_id, store=store)
+        assert context['session_id'] != session_id
+        assert SESSION_ID_PATTERN.fullmatch(context['session_id'])
+
+
+def test_session_ids_are_unique():
+    assert init_context()['session_id'] != init_context()['session_id']
+
+
+def test_save_context_to_file_without_store(file_sessions):
+    message = save_context_to_file(init_context(), filename="../session.json")
+
+    # The name is confined to SESSION_DIR
+    assert message == f"Session saved to {file_sessions / 'session.json'}"
+
+
+def test_incomplete_backend_fails_at_construction():
+    class WriteOnlyStore(SessionStore):
+        def _put(self, session_id, data):
+            pass
+
+    with pytest.raises(TypeError):
+        WriteOnlyStore()
+
+
+def test_build_session_store_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        build_session_store("cassandra")
@@ -0,0 +1,171 @@
+import glob
+import io
+import json
+import pytest
+
+from chatbot import calendar_utils, conversation
+from chatbot.memory import init_context, save_context_to_file
+from chatbot.conversation import call_llm
+from chatbot.replay import (
+    cassette_from_transcript, compare_reports, load_cassette, main, purge_user_recordings, replay_cassette,
+    start_recording,
+)
+
+
+class FakeBedrockClient:
+    """Stands in for bedrock-runtime during recording"""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+
+    def invoke_model(self, **kwargs):
+        body = {
+            'content': [{'type': 'text', 'text': self.replies.pop(0)}],
+            'usage': {'input_tokens': 120, 'output_tokens': 30},
+        }
+        return {'body': io.BytesIO(json.dumps(body).encode('utf-8')), 'contentType': 'application/json'}
+
+
+def record_session(tmp_path, monkeypatch):
+    """Record a two-turn booking conversation against a fake client; needs calendar_file"""
+    calendar_utils.save_calendar({"2025-08-23": {"10:00": "someone", "10:30": None}})
+    monkeypatch.setattr(conversation.llm, 'bedrock_client', FakeBedrockClient([
+        "The next available slot on Saturday is 10:30 AM. Does that work?",
+        "Great, I've scheduled your appointment for:\n\n2025-08-23 at 10:30",
+    ]))
+    assert start_recording(enabled=True, directory=str(tmp_path / "recordings"))
+
+    context = {'conversation_history': [], 'username': 'alice'}
+    _, context = call_llm("I need an appointment on august 23rd 2025 in the morning", context)
+    call_llm("yes, book the appointment", context)
+    return glob.glob(str(tmp_path / "recordings" / "recording_*.jsonl"))[0]
+
+
+@pytest.fixture
+def recorded(tmp_path, monkeypatch, calendar_file):
+    return record_session(tmp_path, monkeypatch)
+
+
+def test_recording_captures_requests_timings_and_usage(recorded):
+    cassette = load_cassette(recorded)
+
+    # Only occupancy is kept, not who booked
+    assert cassette['header']['calendar']["2025-08-23"] == {"10:00": "booked", "10:30": None}
+    assert len(cassette['interactions']) == 2
+    first = cassette['interactions'][0]
+    assert first['username'] == "alice"
+    assert "Today is" in first['request']['system']
+    assert first['response']['usage'] == {'input_tokens': 120, 'output_tokens': 30}
+    assert first['model_ms'] >= 0
+
+
+def test_recordings_are_encrypted_and_purgeable(cipher, calendar_file, tmp_path, monkeypatch):
+    path = record_session(tmp_path, monkeypatch)
+    assert "appointment" not in open(path).read()
+    assert len(load_cassette(path)['interactions']) == 2
+
+    assert purge_user_recordings("bob", directory=str(tmp_path / "recordings")) == 0
+    assert purge_user_recordings("alice", directory=str(tmp_path / "recordings")) == 2
+    assert load_cassette(path)['interactions'] == []
+
+
+def test_replay_reproduces_recording_offline(recorded, monkeypatch):
+    monkeypatch.setattr(conversation.llm, 'bedrock_client', None)
+    monkeypatch.setattr(calendar_utils, 'CALENDAR_FILE', "/nonexistent/calendar.json")
+
+    report = replay_cassette(load_cassette(recorded))
+
+    assert [turn['bookings'] for turn in report['turns']] == [
+        [], [{'scheduled_for': "2025-08-23 10:30", 'status': 'booked'}],
+    ]
+    assert all(turn['request_drift'] == [] for turn in report['turns'])
+    assert report['totals']['input_tokens'] == 240
+    assert compare_reports(report, replay_cassette(load_cassette(recorded))) == []
+    # Replay state is scoped to the call
+    assert conversation.llm.bedrock_client is None
+    assert calendar_utils.CALENDAR_FILE == "/nonexistent/calendar.json"
+
+
+def test_interleaved_sessions_replay_on_their_own_history(calendar_file, tmp_path, monkeypatch):
+    monkeypatch.setattr(conversation.llm, 'bedrock_client', FakeBedrockClient([
+        "Which day works for you?", "Here are some tips.", "Saturday morning has 10:30 free.",
+    ]))
+    assert start_recording(enabled=True, directory=str(tmp_path / "recordings"))
+    alice = {'conversation_history': [], 'username': 'alice', 'session_id': "a"}
+    bob = {'conversation_history': [], 'username': 'bob', 'session_id': "b"}
+    _, alice = call_llm("I need an appointment", alice)
+    call_llm("any health tips?", bob)
+    call_llm("saturday august 23rd 2025 please", alice)
+    cassette = load_cassette(glob.glob(str(tmp_path / "recordings" / "recording_*.jsonl"))[0])
+
+    report = replay_cassette(cassette)
+
+    assert [i['session_id'] for i in cassette['interactions']] == ["a", "b", "a"]
+    assert all(turn['request_drift'] == [] for turn in report['turns'])
+    assert report['totals']['input_tokens'] == 360
+
+
+def test_prompt_growth_is_flagged(recorded, monkeypatch):
+    baseline = replay_cassette(load_cassette(recorded))
+    build_system_prompt = conversation.build_system_prompt
+    monkeypatch.setattr(conversation, 'build_system_prompt',
+                        lambda user_input, now=None: build_system_prompt(user_input, now) + " Be concise." * 100)
+
+    current = replay_cassette(load_cassette(recorded))
+
+    assert current['turns'][0]['request_drift'] == ['system']
+    assert current['turns'][0]['tokens_estimated'] is True
+    assert any("input_tokens rose" in regression for regression in compare_reports(baseline, current))
+
+
+def test_booking_changes_are_flagged(recorded, monkeypatch):
+    baseline = replay_cassette(load_cassette(recorded))
+    monkeypatch.setattr(conversation, 'extract_datetime', lambda text: (None, None))
+
+    regressions = compare_reports(baseline, replay_cassette(load_cassette(recorded)))
+
+    assert regressions == ["turn 2: bookings changed from "
+                           "[{'scheduled_for': '2025-08-23 10:30', 'status': 'booked'}] to []"]
+
+
+def test_latency_regression_is_flagged(recorded):
+    baseline = replay_cassette(load_cassette(recorded))
+    current = json.loads(json.dumps(baseline))
+    current['turns'][1]['local_ms'] = baseline['turns'][1]['local_ms'] * 2 + 50
+
+    assert compare_reports(baseline, current)[0].startswith("turn 2: local latency rose")
+
+
+def test_encrypted_transcript_import(cipher, file_sessions):
+    context = init_context()
+    context['conversation_history'] = [
+        {'role': 'user', 'content': "book an appointment"},
+        {'role': 'assistant', 'content': "Booked for 2025-08-23 at 10:00"},
+    ]
+    save_context_to_file(context, filename="medical_session_1.json")
+
+    cassette = cassette_from_transcript(str(file_sessions / "medical_session_1.json"))
+
+    assert cassette['interactions'][0]['request']['messages'] == context['conversation_history'][:1]
+
+
+def test_transcript_import_and_cli_gate(tmp_path, capsys):
+    session_file = tmp_path / "medical_session_x.json"
+    session_file.write_text(json.dumps({
+        'session_start': "2025-06-23T13:53:38",
+        'conversation_history': [
+            {'role': 'user', 'content': "schedule an appointment at 3pm august 23rd 2025"},
+            {'role': 'assistant', 'content': "Okay, I've scheduled your appointment for:\n\n2025-08-23 at 15:00"},
+        ],
+    }))
+    cassette_path = str(tmp_path / "cassette.jsonl")
+    baseline_path = str(tmp_path / "baseline.json")
+
+    cassette = cassette_from_transcript(str(session_file))
+    assert len(cassette['interactions']) == 1
+    assert 'usage' not in cassette['interactions'][0]['response']
+
+    assert main(["import-transcript", str(session_file), cassette_path]) == 0
+    assert main(["run", cassette_path, "--repeat", "1", "--save-baseline", baseline_path]) == 0
+    assert main(["run", cassette_path, "--repeat", "1", "--baseline", baseline_path]) == 0
+    assert "2025-08-23 15:00 booked" in capsys.readouterr().out
@@ -0,0 +1,148 @@
+import json
+import pytest
+from datetime import date, time, timedelta
+
+import pandas as pd
+
+from chatbot.calendar_utils import generate_daily_slots, load_calendar
+from chatbot.reporting import (
+    export_calendar, export_appointment_events, import_calendar, utilization_report
+)
+
+
+def sample_calendar():
+    day1 = generate_daily_slots()
+    day1.update({"10:00": "alice", "10:30": "alice", "15:00": "bob"})
+    day2 = generate_daily_slots()
+    day2.update({"15:00": "carol"})
+    return {"2025-08-23": day1, "2025-08-24": day2}
+
+
+def year_calendar():
+    calendar = {}
+    start = date(2025, 1, 1)
+    for offset in range(365):
+        slots = generate_daily_slots()
+        for i, slot in enumerate(slots):
+            if (offset + i) % 3:
+                slots[slot] = f"user{(offset * 7 + i) % 50}"
+        calendar[(start + timedelta(days=offset)).isoformat()] = slots
+    return calendar
+
+
+@pytest.mark.parametrize("extension", ["csv", "parquet"])
+def test_export_import_round_trip(calendar_file, tmp_path, extension):
+    calendar_file.write_text(json.dumps(sample_calendar()))
+    export_path = str(tmp_path / f"calendar.{extension}")
+
+    assert export_calendar(export_path) == 24
+
+    calendar_file.write_text("{}")
+    imported, conflicts, rejected = import_calendar(export_path)
+
+    assert imported == 4
+    assert rejected == []
+    assert conflicts == []
+    assert load_calendar() == sample_calendar()
+
+
+def test_import_rejects_malformed_rows(calendar_file, tmp_path):
+    import_path = tmp_path / "seed.csv"
+    import_path.write_text("date,time,provider,username\n"
+                           "2025-08-23,09:00,clinic,dave\n"
+                           "2025-08-23,10:15,clinic,dave\n"
+                           "2025-08-23,16:00,clinic,\n"
+                           "2025-02-30,10:00,clinic,dave\n"
+                           "23/08/2025,10:00,clinic,dave\n"
+                           "2025-08-23,10:30,clinic,erin\n")
+
+    imported, conflicts, rejected = import_calendar(str(import_path))
+
+    assert imported == 1
+    assert conflicts == []
+    assert rejected == [
+        "row 1: '09:00' is not a clinic slot",
+        "row 2: '10:15' is not a clinic slot",
+        "row 3: '16:00' is not a clinic slot",
+        "row 4: invalid date '2025-02-30'",
+        "row 5: invalid date '23/08/2025'",
+    ]
+    assert load_calendar() == {"2025-08-23": dict(generate_daily_slots(), **{"10:30": "erin"})}
+
+
+@pytest.mark.parametrize("day", [date(2026, 11, 2), pd.Timestamp(2026, 11, 2)])
+def test_import_typed_parquet_columns(calendar_file, tmp_path, day):
+    # pandas writes these as Parquet date32/timestamp and time64 columns
+    import_path = str(tmp_path / "seed.parquet")
+    pd.DataFrame({"date": [day, day], "time": [time(10, 0), time(15, 30)],
+                  "username": ["dave", "erin"]}).to_parquet(import_path)
+
+    imported, conflicts, rejected = import_calendar(import_path)
+
+    assert (imported, conflicts, rejected) == (2, [], [])
+    assert load_calendar()["2026-11-02"]["10:00"] == "dave"
+    assert load_calendar()["2026-11-02"]["15:30"] == "erin"
+
+
+def test_import_requires_date_and_time_columns(calendar_file, tmp_path):
+    import_path = tmp_path / "seed.csv"
+    import_path.write_text("day,username\n2025-08-23,dave\n")
+
+    with pytest.raises(ValueError, match="no date or time column"):
+        import_calendar(str(import_path))
+
+
+def test_import_reports_conflicts(calendar_file, tmp_path):
+    calendar_file.write_text(json.dumps(sample_calendar()))
+    import_path = tmp_path / "seed.csv"
+    import_path.write_text("date,time,provider,username\n"
+                           "2025-08-23,15:00,clinic,dave\n"
+                           "2025-08-25,10:00,clinic,dave\n"
+                           "2025-08-26,10:00,clinic,\n")
+
+    imported, conflicts, _ = import_calendar(str(import_path))
+
+    calendar = load_calendar()
+    assert imported == 1
+    assert conflicts == ["2025-08-23 at 15:00"]
+    assert calendar["2025-08-23"]["15:00"] == "bob"
+    assert calendar["2025-08-25"]["10:00"] == "dave"
+    assert set(calendar["2025-08-26"].values()) == {None}
+
+
+def test_export_appointment_events(tmp_path):
+    session_file = tmp_path / "medical_session_1.json"
+    session_file.write_text(json.dumps({
+        'session_id': 'session_1',
+        'username': 'alice',
+        'appointments': [{'request': 'book', 'scheduled_for': '2025-08-23 10:00',
+                          'status': 'booked', 'response': 'ok'}]
+    }))
+    export_path = tmp_path / "events.csv"
+
+    assert export_appointment_events(str(export_path), pattern=str(tmp_path / "medical_session_*.json")) == 1
+    assert "session_1,alice,book,2025-08-23 10:00,booked,ok" in export_path.read_text()
+
+
+def test_export_rejects_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        export_calendar(str(tmp_path / "calendar.xlsx"), calendar={})
+
+
+def test_utilization_report():
+    report = utilization_report(sample_calendar())
+
+    daily = report["daily"]
+    assert list(daily["booked"]) == [3, 1]
+    assert list(daily["fill_rate"]) == [3 / 12, 1 / 12]
+    assert report["peak_hours"].iloc[0]["time"] == "15:00"
+    assert report["peak_hours"].iloc[0]["booked"] == 2
+    candidates = report["no_show_candidates"]
+    assert list(candidates["username"]) == ["alice"]
+    assert list(candidates["bookings"]) == [2]
+
+
+def test_utilization_report_covers_a_year():
+    report = utilization_report(year_calendar())
+
+    assert len(report["daily"]) == 365
@@ -0,0 +1,177 @@
+import gzip
+import json
+import os
+import pytest
+from datetime import datetime, timedelta
+
+from chatbot import calendar_utils
+from chatbot.memory import InMemorySessionStore
+from chatbot.replay import CASSETTE_VERSION, load_cassette, save_cassette
+from chatbot.retention import (
+    RETENTION_POLICIES, sweep_session_files, rotate_log, purge_archives,
+    run_retention_sweep, delete_user_data
+)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch, calendar_file, file_sessions):
+    """Run each test in an empty directory with its own calendar"""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data/sessions")
+    os.makedirs("logs")
+    return tmp_path
+
+
+def write_session(name, username, age=timedelta(0), size=0, directory="data/sessions"):
+    name = os.path.join(directory, name)
+    with open(name, 'w') as f:
+        json.dump({'username': username, 'padding': 'x' * size}, f)
+    mtime = (datetime.now() - age).timestamp()
+    os.utime(name, (mtime, mtime))
+
+
+def test_sweep_removes_files_past_max_age(workdir):
+    write_session("medical_session_old.json", "alice", age=timedelta(days=2))
+    write_session("medical_session_new.json", "alice")
+
+    removed = sweep_session_files(RETENTION_POLICIES['session_files'])
+
+    assert removed == ["./data/sessions/medical_session_old.json"]
+    assert os.path.exists("data/sessions/medical_session_new.json")
+
+
+def test_sweep_leaves_files_outside_the_session_dir(workdir):
+    write_session("medical_session_session_20250623_135338.json", "admin", age=timedelta(days=30), directory=".")
+
+    assert sweep_session_files(RETENTION_POLICIES['session_files']) == []
+    assert os.path.exists("medical_session_session_20250623_135338.json")
+
+
+def test_sweep_enforces_total_size_oldest_first(workdir):
+    policy = dict(RETENTION_POLICIES['session_files'], max_total_bytes=2500)
+    write_session("medical_session_a.json", "alice", age=timedelta(hours=3), size=1000)
+    write_session("medical_session_b.json", "alice", age=timedelta(hours=2), size=1000)
+    write_session("medical_session_c.json", "alice", age=timedelta(hours=1), size=1000)
+
+    removed = sweep_session_files(policy)
+
+    assert removed == ["./data/sessions/medical_session_a.json"]
+
+
+def test_rotate_log_archives_and_truncates(workdir):
+    policy = {'path': "logs/orchestration.log", 'max_bytes': 10, 'archive_max_age': timedelta(days=30)}
+    with open(policy['path'], 'w') as f:
+        f.write("line one\nline two\n")
+
+    archive = rotate_log(policy, archive_dir="logs/archive")
+
+    assert os.path.getsize(policy['path']) == 0
+    with gzip.open(archive, 'rt') as f:
+        assert f.read() == "line one\nline two\n"
+
+
+def test_rotate_log_skips_small_files(workdir):
+    policy = {'path': "logs/audit.log", 'max_bytes': 1024, 'archive_max_age': timedelta(days=30)}
+    with open(policy['path'], 'w') as f:
+        f.write("short\n")
+
+    assert rotate_log(policy, archive_dir="logs/archive") is None
+
+
+def test_purge_archives_by_age(workdir):
+    policy = {'path': "logs/audit.log", 'max_bytes': 10, 'archive_max_age': timedelta(days=30)}
+    os.makedirs("logs/archive")
+    old = "logs/archive/audit.log.20200101_000000.gz"
+    with gzip.open(old, 'wt') as f:
+        f.write("old")
+    mtime = (datetime.now() - timedelta(days=31)).timestamp()
+    os.utime(old, (mtime, mtime))
+
+    assert purge_archives(policy, archive_dir="logs/archive") == [old]
+
+
+def test_run_retention_sweep_summary(workdir):
+    write_session("medical_session_old.json", "alice", age=timedelta(days=2))
+    store = InMemorySessionStore()
+
+    summary = run_retention_sweep(store=store)
+
+    assert summary['session_files'] == {'deleted': 1}
+    assert summary['session_store'] == {'deleted': 0}
+
+
+def test_run_retention_sweep_survives_store_errors(workdir):
+    class LockedStore(InMemorySessionStore):
+        def purge_expired(self):
+            raise RuntimeError("database is locked")
+    write_session("medical_session_old.json", "alice", age=timedelta(days=2))
+
+    summary = run_retention_sweep(store=LockedStore())
+
+    assert summary['session_files'] == {'deleted': 1}
+    assert 'session_store' not in summary
+
+
+def test_delete_user_data_purges_sessions_and_calendar(workdir):
+    write_session("medical_session_1.json", "alice")
+    write_session("medical_session_2.json", "bob")
+    calendar_utils.book_slot("alice", "2025-08-23", "10:00")
+    calendar_utils.book_slot("bob", "2025-08-23", "10:30")
+    store = InMemorySessionStore()
+    store.put("sid", {'username': 'alice'})
+    store.put("other-browser", {'username': 'alice'})
+    store.put("bob-sid", {'username': 'bob'})
+
+    result = delete_user_data("alice", session_ids=["sid"], store=store)
+
+    assert result['session_files'] == ["./data/sessions/medical_session_1.json"]
+    assert result['appointments'] == ["2025-08-23 at 10:00"]
+    assert os.path.exists("data/sessions/medical_session_2.json")
+    assert calendar_utils.list_user_appointments("alice") == []
+    assert calendar_utils.list_user_appointments("bob") == ["2025-08-23 at 10:30"]
+    assert store.get("sid") is None and store.get("other-browser") is None
+    assert store.get("bob-sid") is not None
+    assert result['stored_sessions'] == 1
+    with open("logs/audit.log") as log:
+        assert "DELETE_DATA - alice" in log.read()
+
+
+def test_delete_user_data_ignores_file_names(workdir):
+    # Every session file is named medical_session_*, so a user called "medical" owns none of them
+    write_session("medical_session_1.json", "alice")
+    write_session("medical_session_2.json", "bob")
+
+    result = delete_user_data("medical", store=InMemorySessionStore())
+
+    assert result['session_files'] == []
+    assert os.path.exists("data/sessions/medical_session_1.json")
+    assert os.path.exists("data/sessions/medical_session_2.json")
+
+
+def test_delete_user_data_purges_llm_recordings(workdir):
+    os.makedirs("data/recordings")
+    header = {'cassette': CASSETTE_VERSION, 'recorded_at': "2025-06-23T13:53:38", 'calendar': {}}
+    interactions = [{'username': 'alice', 'request': {}}, {'username': 'bob', 'request': {}}]
+    save_cassette("data/recordings/recording_20250623.jsonl", {'header': header, 'interactions': interactions})
+
+    result = delete_user_data("alice", store=InMemorySessionStore())
+
+    assert result['recordings'] == 1
+    assert load_cassette("data/recordings/recording_20250623.jsonl")['interactions'] == interactions[1:]
+    with open("logs/audit.log") as log:
+        assert "1 recorded LLM calls" in log.read()
+
+
+def test_delete_user_data_survives_unreadable_recordings(workdir):
+    os.makedirs("data/recordings")
+    with open("data/recordings/recording_20250622.jsonl", 'w') as f:
+        f.write("not json\n")
+    header = {'cassette': CASSETTE_VERSION, 'recorded_at': "2025-06-23T13:53:38", 'calendar': {}}
+    save_cassette("data/recordings/recording_20250623.jsonl",
+                  {'header': header, 'interactions': [{'username': 'alice', 'request': {}}]})
+
+    result = delete_user_data("alice", store=InMemorySessionStore())
+
+    assert result['recordings'] == 1
+    with open("logs/audit.log") as log:
+        assert "DELETE_DATA - alice" in log.read()